@@ -1,10 +1,20 @@
+import os
+from datetime import datetime, timezone
+
 # API Endpoints
 fetcher_endpoint = "/fetchers/"
 database_endpoint = "/database/"
 stats_endpoint = "/stats/"
 frontier_endpoint = "/frontiers/"
+frontier_stream_endpoint = "/frontiers/stream/"
+submit_endpoint = "/submit/"
+url_refs_endpoint = "/url_refs/"
 settings_endpoint = "/settings/"
 urls_endpoint = "/urls/random/"
+reaper_stats_endpoint = "/stats/reaper/"
+url_ref_stats_endpoint = "/stats/url_refs/"
+pool_stats_endpoint = "/stats/pool/"
+balance_stats_endpoint = "/stats/balance/"
 
 
 # DB_Models
@@ -27,9 +37,60 @@ max_url = 100
 visited_ratio = 0.0
 connections = 0
 
+# Database
+database_async = os.environ.get("DATABASE_ASYNC", "false").lower() == "true"
+database_echo = os.environ.get("DATABASE_ECHO", "false").lower() == "true"
+database_pool_size = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+database_max_overflow = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+database_pool_recycle = int(os.environ.get("DATABASE_POOL_RECYCLE", -1))
+database_pool_pre_ping = (
+    os.environ.get("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+)
+database_statement_timeout = int(os.environ.get("DATABASE_STATEMENT_TIMEOUT", 0))
+
 # Fetcher Settings
 ch_hash_amount = 32
+hash_ring_ttl = int(os.environ.get("HASH_RING_TTL", 60))
+settings_cache_ttl = int(os.environ.get("SETTINGS_CACHE_TTL", 30))
+settings_channel = "fetcher_settings"
+fetcher_registry_ttl = int(os.environ.get("FETCHER_REGISTRY_TTL", 60))
+fetchers_channel = "fetchers"
+notification_reconnect_seconds = 5
 
 # Frontier Settings
 response_url = "http://ec2-18-195-144-15.eu-central-1.compute.amazonaws.com/submit/"
 hours_to_die = 12
+frontier_stream_batch = 1000
+
+# Statistics
+stats_cache_ttl = int(os.environ.get("STATS_CACHE_TTL", 5))
+stats_exact_threshold = 10000
+stats_sample_size = 10000
+
+# Sample Generator
+generate_copy_chunk = 100000
+generate_url_pool_size = 100000
+generate_shard_size = 10000
+generate_seeded_dates_end = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+# Submission Settings
+submit_batch_size = 1000
+
+# URL Reference Ingest
+url_ref_queue_size = int(os.environ.get("URL_REF_QUEUE_SIZE", 1000000))
+url_ref_writer_amount = int(os.environ.get("URL_REF_WRITERS", 2))
+url_ref_write_batch = int(os.environ.get("URL_REF_WRITE_BATCH", 10000))
+url_ref_write_attempts = 3
+
+# Frontier Cache
+frontier_cache = os.environ.get("FRONTIER_CACHE", "false").lower() == "true"
+frontier_cache_resync_seconds = int(os.environ.get("FRONTIER_CACHE_RESYNC", 300))
+
+# Reservation Reaper
+reaper_interval_seconds = int(os.environ.get("RESERVATION_REAPER_INTERVAL", 60))
+reaper_batch_size = int(os.environ.get("RESERVATION_REAPER_BATCH", 5000))
+
+# Schema Migrations
+schema_migration = os.environ.get("SCHEMA_MIGRATION", "skip").lower()
+schema_lock_key = 4711
+migration_batch_size = int(os.environ.get("SCHEMA_MIGRATION_BATCH", 10000))
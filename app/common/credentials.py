@@ -4,3 +4,4 @@ postgres_user = os.environ['POSTGRES_ENV_USER']
 postgres_pw = os.environ['POSTGRES_ENV_PW']
 postgres_uri = os.environ['POSTGRES_ENV_URI']
 postgres_db = os.environ['POSTGRES_ENV_DB']
+postgres_replica_uri = os.environ.get('POSTGRES_ENV_REPLICA_URI')
@@ -21,3 +21,20 @@ def raise_http_400(value1, value2):
         status_code=status.HTTP_400_BAD_REQUEST,
         detail="Value {} is larger than {}".format(value1, value2),
     )
+
+
+def raise_http_503(queued, capacity):
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Ingest queue is full ({} of {} items queued), "
+        "please retry later".format(queued, capacity),
+        headers={"Retry-After": "1"},
+    )
+
+
+def raise_http_413(amount, capacity):
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Batch of {} items exceeds the ingest queue capacity of {}, "
+        "please split it".format(amount, capacity),
+    )
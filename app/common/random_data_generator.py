@@ -1,14 +1,17 @@
 import random
 import string
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from app.common import enum
 from app.data import data_generator as data_gen
 
 
-def random_datetime():
-    start = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0)
-    end = datetime.now()
+def random_datetime(end: datetime = None):
+    start = datetime(
+        year=2000, month=1, day=1, hour=0, minute=0, second=0, tzinfo=timezone.utc
+    )
+    if end is None:
+        end = datetime.now(tz=timezone.utc)
     delta = end - start
     int_delta = (delta.days * 24 * 60 * 60) + delta.seconds
     random_second = random.randrange(int_delta)
@@ -74,10 +77,11 @@ def random_url(fqdn: str):
 
 
 def random_urls(fqdn: str, amount: int):
-    url_set = set()
-    while len(url_set) < amount:
-        url_set.add(random_url(fqdn))
-    return list(url_set)
+    # A dict keeps the generation order, which makes seeded runs reproducible
+    urls = dict()
+    while len(urls) < amount:
+        urls[random_url(fqdn)] = None
+    return list(urls)
 
 
 def int_to_roman(num):
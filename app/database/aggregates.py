@@ -0,0 +1,125 @@
+from collections import defaultdict
+from datetime import timezone
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.sql.expression import func
+
+from app.database import db_models
+
+
+def timestamp(date_time):
+    """
+    Seconds since the epoch, naive datetimes are taken as UTC like the
+    to_timestamp and extract(epoch) results of the database
+    """
+    if date_time is None:
+        return 0.0
+
+    if date_time.tzinfo is None:
+        date_time = date_time.replace(tzinfo=timezone.utc)
+
+    return date_time.timestamp()
+
+
+def new_deltas():
+    return defaultdict(
+        lambda: dict(
+            url_count=0, pagerank_sum=0.0, visited_count=0, last_visited_sum=0.0
+        )
+    )
+
+
+def add_url(deltas, fqdn, url_pagerank=None, url_last_visited=None):
+    delta = deltas[fqdn]
+    delta["url_count"] += 1
+    delta["pagerank_sum"] += url_pagerank or 0.0
+
+    if url_last_visited is not None:
+        delta["visited_count"] += 1
+        delta["last_visited_sum"] += timestamp(url_last_visited)
+
+
+def visit_url(deltas, fqdn, old_last_visited, new_last_visited):
+    delta = deltas[fqdn]
+
+    if old_last_visited is None:
+        delta["visited_count"] += 1
+
+    delta["last_visited_sum"] += timestamp(new_last_visited) - timestamp(
+        old_last_visited
+    )
+
+
+def url_list_aggregates(url_list):
+    """
+    Aggregate columns of a FQDN computed from its complete URL list
+    """
+    deltas = new_deltas()
+    for url in url_list:
+        add_url(deltas, None, url.url_pagerank, url.url_last_visited)
+
+    return aggregate_values(**deltas[None])
+
+
+def aggregate_values(url_count, pagerank_sum, visited_count, last_visited_sum):
+    return dict(
+        fqdn_url_count=url_count,
+        fqdn_pagerank_sum=pagerank_sum,
+        fqdn_avg_pagerank=pagerank_sum / url_count if url_count else None,
+        fqdn_visited_count=visited_count,
+        fqdn_last_visited_sum=last_visited_sum,
+        fqdn_avg_last_visited_date=(
+            func.to_timestamp(last_visited_sum / visited_count)
+            if visited_count
+            else None
+        ),
+    )
+
+
+def apply_deltas(db, deltas):
+    """
+    Adds the URL count, pagerank and visiting date deltas per FQDN to the
+    running sums of the frontiers and recomputes their averages
+    """
+    if not deltas:
+        return True
+
+    url_count = func.coalesce(db_models.Frontier.fqdn_url_count, 0) + bindparam(
+        "delta_url_count"
+    )
+    pagerank_sum = func.coalesce(db_models.Frontier.fqdn_pagerank_sum, 0.0) + bindparam(
+        "delta_pagerank_sum"
+    )
+    visited_count = func.coalesce(db_models.Frontier.fqdn_visited_count, 0) + bindparam(
+        "delta_visited_count"
+    )
+    last_visited_sum = func.coalesce(
+        db_models.Frontier.fqdn_last_visited_sum, 0.0
+    ) + bindparam("delta_last_visited_sum")
+
+    db.execute(
+        update(db_models.Frontier)
+        .where(db_models.Frontier.fqdn == bindparam("delta_fqdn"))
+        .values(
+            fqdn_url_count=url_count,
+            fqdn_pagerank_sum=pagerank_sum,
+            fqdn_avg_pagerank=pagerank_sum / func.nullif(url_count, 0),
+            fqdn_visited_count=visited_count,
+            fqdn_last_visited_sum=last_visited_sum,
+            fqdn_avg_last_visited_date=func.to_timestamp(
+                last_visited_sum / func.nullif(visited_count, 0)
+            ),
+        ),
+        [
+            dict(
+                delta_fqdn=fqdn,
+                delta_url_count=delta["url_count"],
+                delta_pagerank_sum=delta["pagerank_sum"],
+                delta_visited_count=delta["visited_count"],
+                delta_last_visited_sum=delta["last_visited_sum"],
+            )
+            for fqdn, delta in sorted(deltas.items())
+        ],
+    )
+
+    return True
@@ -1,23 +1,220 @@
-from sqlalchemy import create_engine, or_, and_
+import logging
+import os
+
+from sqlalchemy import create_engine, delete, false, inspect, text, or_, and_
 from sqlalchemy.orm import sessionmaker, aliased
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.expression import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex, DropIndex
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+except ImportError:  # SQLAlchemy < 1.4
+    AsyncSession = create_async_engine = None
 
 from app.common import credentials as cred
+from app.common import common_values as c
 from app.common import enum
-from app.database import pyd_models, db_models
+from app.database import pyd_models, db_models, hash_ring, settings_cache
+from app.database import fetcher_registry
+
+
+def database_url(uri, driver="postgresql"):
+    return "{}://{}:{}@{}/{}".format(
+        driver, cred.postgres_user, cred.postgres_pw, uri, cred.postgres_db
+    )
+
 
+def engine_options():
+    """
+    Pool and logging options of the engines, set by the DATABASE_* variables
+    """
+    return dict(
+        echo=c.database_echo,
+        pool_size=c.database_pool_size,
+        max_overflow=c.database_max_overflow,
+        pool_recycle=c.database_pool_recycle,
+        pool_pre_ping=c.database_pool_pre_ping,
+    )
+
+
+def create_sync_engine(uri):
+    return create_engine(
+        database_url(uri),
+        connect_args={
+            "options": "-c statement_timeout={}".format(c.database_statement_timeout)
+        },
+        **engine_options()
+    )
 
-SQLALCHEMY_DATABASE_URL = "postgresql://{}:{}@{}/{}".format(
-    cred.postgres_user, cred.postgres_pw, cred.postgres_uri, cred.postgres_db
-)
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True, pool_pre_ping=True)
 
+def async_session_factory(uri):
+    async_engine = create_async_engine(
+        database_url(uri, driver="postgresql+asyncpg"),
+        connect_args={
+            "server_settings": {"statement_timeout": str(c.database_statement_timeout)}
+        },
+        **engine_options()
+    )
+    # Responses are serialized outside of run, where expired attributes
+    # could not be loaded
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=async_engine,
+        class_=AsyncSession,
+    )
+
+
+engine = create_sync_engine(cred.postgres_uri)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only endpoints use the replica, if configured
+ReplicaSessionLocal = None
+if cred.postgres_replica_uri:
+    ReplicaSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=create_sync_engine(cred.postgres_replica_uri),
+    )
+
+AsyncSessionLocal = None
+AsyncReplicaSessionLocal = None
+
+if c.database_async:
+    if create_async_engine is None:
+        logging.warning("DATABASE_ASYNC needs SQLAlchemy 1.4, using the threadpool")
+    else:
+        AsyncSessionLocal = async_session_factory(cred.postgres_uri)
+        if cred.postgres_replica_uri:
+            AsyncReplicaSessionLocal = async_session_factory(cred.postgres_replica_uri)
+
+
+def read_session():
+    """
+    A session on the replica, or on the primary if the replica is not
+    configured or not reachable
+    """
+    if ReplicaSessionLocal is not None:
+        db = ReplicaSessionLocal()
+        try:
+            db.connection()
+            return db
+        except OperationalError:
+            logging.warning("Replica not reachable, reading from the primary")
+            db.close()
+
+    return SessionLocal()
+
+
+async def async_read_session():
+    if AsyncReplicaSessionLocal is not None:
+        db = AsyncReplicaSessionLocal()
+        try:
+            await db.connection()
+            return db
+        except (OperationalError, OSError):
+            logging.warning("Replica not reachable, reading from the primary")
+            await db.close()
+
+    return AsyncSessionLocal()
+
+
 Base = declarative_base()
 
 
+async def run(db, function, *args):
+    """
+    Awaits synchronous database code, on the asyncpg connection of an
+    AsyncSession or in the threadpool for a Session
+    """
+    if AsyncSession is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(function, *args)
+
+    return await run_in_threadpool(function, db, *args)
+
+
+def get_pool_stats():
+    pool = engine.pool
+    return dict(
+        worker_pid=os.getpid(),
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=pool.overflow(),
+    )
+
+
+def get_index_validity(conn, table_name):
+    return dict(
+        conn.execute(
+            text(
+                "SELECT index_class.relname, pg_index.indisvalid FROM pg_index "
+                "JOIN pg_class AS index_class "
+                "ON index_class.oid = pg_index.indexrelid "
+                "JOIN pg_class AS table_class "
+                "ON table_class.oid = pg_index.indrelid "
+                "WHERE table_class.relname = :table_name"
+            ),
+            table_name=table_name,
+        ).fetchall()
+    )
+
+
+def execute_concurrently(conn, ddl):
+    """
+    Executes CREATE or DROP INDEX with CONCURRENTLY, which create_all must not use
+    """
+    dialect_options = ddl.element.dialect_options["postgresql"]
+    dialect_options["concurrently"] = True
+    try:
+        conn.execute(ddl)
+    finally:
+        dialect_options["concurrently"] = False
+
+
+def create_missing_indexes(conn):
+    """
+    Builds the model indexes which create_all skips for already existing
+    tables, concurrently to not block writes on large tables. Invalid indexes
+    left by failed concurrent builds are rebuilt. Needs an autocommit
+    connection, the schema migrations call it under their lock.
+    """
+    created = []
+
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        column_names = {column["name"] for column in inspector.get_columns(table.name)}
+        index_validity = get_index_validity(conn, table.name)
+
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index_validity.get(index.name):
+                continue
+
+            if not {column.name for column in index.columns} <= column_names:
+                logging.warning(
+                    "Index {} skipped, its columns are missing".format(index.name)
+                )
+                continue
+
+            if index.name in index_validity:
+                execute_concurrently(conn, DropIndex(index))
+
+            execute_concurrently(conn, CreateIndex(index))
+            created.append(index.name)
+
+    return created
+
+
 def reset(db, request: pyd_models.DeleteDatabase):
     if request.delete_url_refs:
         db.query(db_models.URLRef).delete()
@@ -26,10 +223,12 @@ def reset(db, request: pyd_models.DeleteDatabase):
     if request.delete_fetcher_hashes:
         db.query(db_models.FetcherHash).delete()
         db.commit()
+        hash_ring.invalidate()
 
     if request.delete_fetchers:
         db.query(db_models.Fetcher).delete()
         db.commit()
+        fetcher_registry.changed(db)
 
     if request.delete_urls:
         db.query(db_models.Url).delete()
@@ -47,35 +246,64 @@ def reset(db, request: pyd_models.DeleteDatabase):
 
 
 def refresh_fqdn_hashes(db):
-    frontier = db.query(db_models.Frontier).all()
     fetcher_amount = db.query(db_models.Fetcher).count()
 
     if fetcher_amount != 0:
-        for f in frontier:
-            f.fqdn_hash_fetcher_index = hash(f.fqdn) % fetcher_amount
-
-        db.bulk_save_objects(frontier)
+        db.query(db_models.Frontier).update(
+            {
+                db_models.Frontier.fqdn_hash_fetcher_index: db_models.Frontier.fqdn_hash
+                % fetcher_amount
+            },
+            synchronize_session=False,
+        )
         db.commit()
 
     return True
 
 
-def fqdn_hash_activated(db):
-    return (
-        db.query(db_models.FetcherSettings.long_term_part_mode)
-        .filter(db_models.FetcherSettings.id == 1)
-        .scalar()
-        == enum.LONGPART.fqdn_hash
+def reserve_fqdns(db, uuid, fqdns, latest_return):
+    """
+    Reserves the FQDNs against the unique FQDN index of the reservations and
+    returns the reserved ones. FQDNs actively reserved by another fetcher,
+    also by concurrent uncommitted claims, are left out.
+    """
+    if not fqdns:
+        return []
+
+    insert_query = insert(db_models.FetcherReservation).values(
+        [
+            dict(fetcher_uuid=str(uuid), fqdn=fqdn, latest_return=latest_return)
+            for fqdn in dict.fromkeys(fqdns)
+        ]
     )
+    reserved = db.execute(
+        insert_query.on_conflict_do_update(
+            index_elements=[db_models.FetcherReservation.fqdn],
+            set_=dict(
+                fetcher_uuid=insert_query.excluded.fetcher_uuid,
+                latest_return=insert_query.excluded.latest_return,
+            ),
+            where=or_(
+                db_models.FetcherReservation.fetcher_uuid
+                == insert_query.excluded.fetcher_uuid,
+                db_models.FetcherReservation.latest_return <= func.now(),
+            ),
+        ).returning(db_models.FetcherReservation.fqdn)
+    )
+    return [fqdn for fqdn, in reserved]
+
+
+def long_term_part_mode(db):
+    fetcher_settings = settings_cache.get_settings(db)
+    return None if fetcher_settings is None else fetcher_settings.long_term_part_mode
+
+
+def fqdn_hash_activated(db):
+    return long_term_part_mode(db) == enum.LONGPART.fqdn_hash
 
 
 def consistent_hash_activated(db):
-    return (
-        db.query(db_models.FetcherSettings.long_term_part_mode)
-        .filter(db_models.FetcherSettings.id == 1)
-        .scalar()
-        == enum.LONGPART.consistent_hashing
-    )
+    return long_term_part_mode(db) == enum.LONGPART.consistent_hashing
 
 
 def get_fetcher_hashes(db):
@@ -107,6 +335,9 @@ def get_fetcher_hash_ranges(db, uuid):
 
 
 def get_hash_range_filter_query(fetcher_hash_range):
+    if not fetcher_hash_range:
+        return false()
+
     hash_range_filter = [
         and_(
             db_models.Frontier.fqdn_hash >= hash_range[1],
@@ -132,3 +363,47 @@ def get_hash_range_filter_query(fetcher_hash_range):
         )
 
     return or_(*hash_range_filter)
+
+
+def get_hash_range_filter(start_hash, end_hash):
+    if start_hash < end_hash:
+        return and_(
+            db_models.Frontier.fqdn_hash >= start_hash,
+            db_models.Frontier.fqdn_hash < end_hash,
+        )
+
+    return or_(
+        db_models.Frontier.fqdn_hash >= start_hash,
+        db_models.Frontier.fqdn_hash < end_hash,
+    )
+
+
+def release_hash_ranges(db, moved_ranges):
+    release_filter = [
+        and_(
+            db_models.FetcherReservation.fetcher_uuid == old_uuid,
+            db_models.FetcherReservation.fqdn.in_(
+                db.query(db_models.Frontier.fqdn).filter(
+                    get_hash_range_filter(start_hash, end_hash)
+                )
+            ),
+        )
+        for start_hash, end_hash, old_uuid, _ in moved_ranges
+        if old_uuid is not None
+    ]
+
+    if not release_filter:
+        return []
+
+    released = db.execute(
+        delete(db_models.FetcherReservation)
+        .where(or_(*release_filter))
+        .returning(
+            db_models.FetcherReservation.fetcher_uuid,
+            db_models.FetcherReservation.fqdn,
+        )
+        .execution_options(synchronize_session=False)
+    ).fetchall()
+    db.commit()
+
+    return released
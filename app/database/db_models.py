@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     Index,
+    text,
 )
 
 from app.database.database import Base
@@ -39,7 +40,7 @@ class Frontier(Base):
     fqdn = Column(String, primary_key=True, index=True)
     tld = Column(String, index=True)
 
-    fqdn_hash = Column(BigInteger)
+    fqdn_hash = Column(BigInteger, index=True)
     fqdn_hash_fetcher_index = Column(Integer)
 
     fqdn_last_ipv4 = Column(String)
@@ -48,8 +49,15 @@ class Frontier(Base):
     fqdn_url_count = Column(Integer)
     fqdn_avg_pagerank = Column(Float)
     fqdn_avg_last_visited_date = Column(DateTime(timezone=True))
+
+    fqdn_pagerank_sum = Column(Float)
+    fqdn_visited_count = Column(Integer)
+    fqdn_last_visited_sum = Column(Float)
+
     fqdn_crawl_delay = Column(Integer)
 
+    fqdn_random_key = Column(Float, index=True, server_default=text("random()"))
+
 
 class Url(Base):
     __tablename__ = "urls"
@@ -63,6 +71,8 @@ class Url(Base):
     url_blacklisted = Column(Boolean)
     url_bot_excluded = Column(Boolean)
 
+    url_random_key = Column(Float, index=True, server_default=text("random()"))
+
 
 class FetcherReservation(Base):
     __tablename__ = "fetcher_reservations"
@@ -71,7 +81,7 @@ class FetcherReservation(Base):
         String, ForeignKey(c.db_fetcher_pk, ondelete="CASCADE"), primary_key=True
     )
     fqdn = Column(String, ForeignKey(c.db_fqdn_pk), primary_key=True)
-    latest_return = Column(DateTime(timezone=True))
+    latest_return = Column(DateTime(timezone=True), index=True)
 
 
 class FetcherSettings(Base):
@@ -114,3 +124,25 @@ class URLRef(Base):
     Index("url_ref_index", url_out, url_in)
 
 
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    revision = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_date = Column(DateTime(timezone=True))
+
+
+# Order Indexes of the Long Term Prioritization Modes
+Index("frontier_url_count_index", Frontier.fqdn_url_count)
+Index("frontier_avg_pagerank_index", Frontier.fqdn_avg_pagerank.desc())
+Index("frontier_avg_last_visited_index", Frontier.fqdn_avg_last_visited_date)
+
+# Per FQDN Order Indexes of the Short Term Prioritization Modes
+Index(
+    "url_fqdn_last_visited_index", Url.fqdn, Url.url_last_visited.asc().nullsfirst()
+)
+Index("url_fqdn_pagerank_index", Url.fqdn, Url.url_pagerank.desc())
+Index("url_fqdn_random_key_index", Url.fqdn, Url.url_random_key)
+
+# One Reservation per FQDN, expired ones are taken over by the next claim
+Index("fetcher_reservation_fqdn_index", FetcherReservation.fqdn, unique=True)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from app.database import db_models, notifications
+from app.common import common_values as c
+
+
+class FetcherRegistry:
+    """
+    All fetchers by UUID, with their index in registration order as used for
+    the fqdn hash partitioning
+    """
+
+    def __init__(self, fetchers):
+        self.fetchers = {fetcher.uuid: fetcher for fetcher in fetchers}
+        self.indexes = {fetcher.uuid: i for i, fetcher in enumerate(fetchers)}
+
+    def get(self, uuid):
+        return self.fetchers.get(str(uuid))
+
+    def index(self, uuid):
+        return self.indexes.get(str(uuid), -1)
+
+
+registry_cache = dict(registry=None, loaded_at=None)
+registry_lock = threading.Lock()
+
+
+def load_registry(db):
+    return FetcherRegistry(
+        db.query(
+            db_models.Fetcher.uuid,
+            db_models.Fetcher.contact,
+            db_models.Fetcher.name,
+            db_models.Fetcher.reg_date,
+            db_models.Fetcher.location,
+            db_models.Fetcher.tld_preference,
+        )
+        .order_by(db_models.Fetcher.reg_date.asc())
+        .all()
+    )
+
+
+def get_registry(db):
+    with registry_lock:
+        if (
+            registry_cache["registry"] is None
+            or time.monotonic() - registry_cache["loaded_at"] > c.fetcher_registry_ttl
+        ):
+            registry_cache["registry"] = load_registry(db)
+            registry_cache["loaded_at"] = time.monotonic()
+
+        return registry_cache["registry"]
+
+
+def get_fetcher(db, uuid):
+    """
+    The fetcher or None, reloading the registry once for fetchers unknown to
+    the cached registry, e.g. registered by another worker
+    """
+    fetcher = get_registry(db).get(uuid)
+
+    if fetcher is None:
+        invalidate()
+        fetcher = get_registry(db).get(uuid)
+
+    return fetcher
+
+
+def invalidate():
+    with registry_lock:
+        registry_cache["registry"] = None
+
+
+def changed(db):
+    """
+    Invalidates the registry of all workers after committed fetcher changes
+    """
+    notifications.notify(db, c.fetchers_channel)
+    db.commit()
+    invalidate()
+
+
+notifications.listener.subscribe(c.fetchers_channel, invalidate)
@@ -1,6 +1,9 @@
+import logging
+
 from sqlalchemy.orm import Session
 
-from app.database import db_models, pyd_models, database
+from app.database import db_models, pyd_models, database, frontier_cache, hash_ring
+from app.database import fetcher_registry
 from app.data import data_generator as data_gen
 from app.common import http_exceptions as http
 from app.common import common_values as c
@@ -9,10 +12,7 @@ from datetime import datetime, timezone
 
 
 def uuid_exists(db: Session, uuid):
-    if db.query(db_models.Fetcher).filter(db_models.Fetcher.uuid == uuid).count() == 1:
-        return True
-    else:
-        return False
+    return fetcher_registry.get_fetcher(db, uuid) is not None
 
 
 def create_fetcher(db: Session, fetcher: pyd_models.CreateFetcher):
@@ -25,6 +25,7 @@ def create_fetcher(db: Session, fetcher: pyd_models.CreateFetcher):
     ):
         http.raise_http_409(fetcher.contact, fetcher.name)
 
+    old_ring = hash_ring.load_ring(db)
     new_uuid = str(uuid4())
 
     db_fetcher = db_models.Fetcher(
@@ -50,9 +51,25 @@ def create_fetcher(db: Session, fetcher: pyd_models.CreateFetcher):
     db.bulk_save_objects(db_fetcher_hashes)
     db.commit()
 
+    fetcher_registry.changed(db)
+    hash_ring.invalidate()
+    rebalance(db, old_ring)
+
     return db_fetcher
 
 
+def rebalance(db: Session, old_ring: hash_ring.HashRing):
+    moved_ranges = hash_ring.ring_delta(old_ring, hash_ring.get_ring(db))
+
+    if moved_ranges and database.consistent_hash_activated(db):
+        frontier_cache.cache.release_reservations(
+            database.release_hash_ranges(db, moved_ranges)
+        )
+
+    logging.info("Consistent hashing moved {} hash ranges".format(len(moved_ranges)))
+    return moved_ranges
+
+
 def get_all_fetcher(db: Session):
     return db.query(db_models.Fetcher).all()
 
@@ -73,6 +90,7 @@ def update_fetcher(db: Session, fetcher: pyd_models.UpdateFetcher):
     db_fetcher.tld_preference = fetcher.tld_preference
 
     db.commit()
+    fetcher_registry.changed(db)
     db.refresh(db_fetcher)
 
     return db_fetcher
@@ -101,6 +119,7 @@ def patch_fetcher(db: Session, fetcher: pyd_models.UpdateFetcher):
         db_fetcher.tld_preference = fetcher.tld_preference
 
     db.commit()
+    fetcher_registry.changed(db)
     db.refresh(db_fetcher)
 
     return db_fetcher
@@ -110,6 +129,8 @@ def delete_fetcher(db: Session, fetcher: pyd_models.DeleteFetcher):
     if not uuid_exists(db, str(fetcher.uuid)):
         http.raise_http_404(fetcher.uuid)
 
+    old_ring = hash_ring.load_ring(db)
+
     db.query(db_models.FetcherReservation).filter(
         db_models.FetcherReservation.fetcher_uuid == str(fetcher.uuid)
     ).delete()
@@ -120,6 +141,11 @@ def delete_fetcher(db: Session, fetcher: pyd_models.DeleteFetcher):
         db_models.Fetcher.uuid == str(fetcher.uuid)
     ).delete()
     db.commit()
+
+    fetcher_registry.changed(db)
+    hash_ring.invalidate()
+    rebalance(db, old_ring)
+    frontier_cache.cache.release_fetcher(fetcher.uuid)
     return True
 
 
@@ -128,3 +154,7 @@ def delete_fetchers(db: Session):
     db.query(db_models.FetcherHash).delete()
     db.query(db_models.Fetcher).delete()
     db.commit()
+
+    fetcher_registry.changed(db)
+    hash_ring.invalidate()
+    frontier_cache.cache.release_all()
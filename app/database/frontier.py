@@ -1,13 +1,17 @@
+import random
 from datetime import datetime, timedelta, timezone
+from itertools import groupby
 
 from app.database import db_models, pyd_models, fetchers, database
+from app.database import frontier_cache, hash_ring, settings_cache, fetcher_registry
 from app.common import enum, http_exceptions as http_ex, common_values as c
 
 from sqlalchemy.sql.expression import func
-from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session, aliased
 
 
-def create_fqdn_list(db, request):
+def fqdn_list_query(db, request):
     fqdn_reservation_list = db.query(db_models.FetcherReservation.fqdn).filter(
         db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
     )
@@ -18,43 +22,58 @@ def create_fqdn_list(db, request):
 
     # Filter
     if request.long_term_part_mode == enum.LONGPART.top_level_domain:
-        fetcher_pref_tld = (
-            db.query(db_models.Fetcher)
-            .filter(db_models.Fetcher.uuid == str(request.fetcher_uuid))
-            .first()
+        fetcher_pref_tld = fetcher_registry.get_fetcher(
+            db, request.fetcher_uuid
         ).tld_preference
 
         fqdn_list = fqdn_list.filter(db_models.Frontier.tld == fetcher_pref_tld)
 
     elif request.long_term_part_mode == enum.LONGPART.fqdn_hash:
-        fetcher = (
-            db.query(db_models.Fetcher).order_by(db_models.Fetcher.reg_date.asc()).all()
-        )
-
-        fetcher_index = next(
-            (
-                i
-                for i, item in enumerate(fetcher)
-                if item.uuid == str(request.fetcher_uuid)
-            ),
-            -1,
-        )
+        fetcher_index = fetcher_registry.get_registry(db).index(request.fetcher_uuid)
 
         fqdn_list = fqdn_list.filter(
             db_models.Frontier.fqdn_hash_fetcher_index == fetcher_index
         )
 
     elif request.long_term_part_mode == enum.LONGPART.consistent_hashing:
-        fetcher_hash_ranges = database.get_fetcher_hash_ranges(db, str(request.fetcher_uuid))
+        fetcher_hash_ranges = hash_ring.get_fetcher_ranges(db, request.fetcher_uuid)
 
         filter_query = database.get_hash_range_filter_query(fetcher_hash_ranges)
 
         fqdn_list = fqdn_list.filter(filter_query)
 
+    return fqdn_list
+
+
+def random_sample(query, random_key, amount):
+    """
+    Returns rows in order of an indexed random key, starting at a random pivot
+    and wrapping around, instead of sorting the whole table by random()
+    """
+    pivot = random.random()
+
+    sample = query.filter(random_key >= pivot).order_by(random_key)
+    if amount > 0:
+        sample = sample.limit(amount)
+
+    rv = [item for item in sample]
+
+    if amount <= 0 or len(rv) < amount:
+        remainder = query.filter(random_key < pivot).order_by(random_key)
+        if amount > 0:
+            remainder = remainder.limit(amount - len(rv))
+
+        rv.extend(remainder)
+
+    return rv
+
 
+def select_fqdn_list(fqdn_list, request):
     # Order
     if request.long_term_prio_mode == enum.LONGPRIO.random:
-        fqdn_list = fqdn_list.order_by(func.random())
+        return random_sample(
+            fqdn_list, db_models.Frontier.fqdn_random_key, request.amount
+        )
 
     elif request.long_term_prio_mode == enum.LONGPRIO.large_sites_first:
         fqdn_list = fqdn_list.order_by(db_models.Frontier.fqdn_url_count.desc())
@@ -79,31 +98,95 @@ def create_fqdn_list(db, request):
     return rv
 
 
-def short_term_frontier(db, request, fqdn):
-    db_url_list = db.query(db_models.Url).filter(db_models.Url.fqdn == fqdn.fqdn)
+def create_fqdn_list(db, request):
+    return select_fqdn_list(fqdn_list_query(db, request), request)
 
-    # Order
+
+def claim_fqdn_list(db, request, latest_return):
+    """
+    Selects and reserves the FQDNs in one transaction. Frontier rows locked
+    by a concurrent claim are skipped instead of waited for, FQDNs reserved
+    by a claim committed after the selection are dropped by the reservation.
+    """
+    fqdn_list = fqdn_list_query(db, request).with_for_update(
+        skip_locked=True, of=db_models.Frontier
+    )
+    fqdns = select_fqdn_list(fqdn_list, request)
+
+    reserved = set(
+        database.reserve_fqdns(
+            db, request.fetcher_uuid, [fqdn.fqdn for fqdn in fqdns], latest_return
+        )
+    )
+    fqdns = [fqdn for fqdn in fqdns if fqdn.fqdn in reserved]
+
+    for fqdn in fqdns:
+        db.expunge(fqdn)
+
+    db.commit()
+    return fqdns
+
+
+def url_order(request):
     if request.short_term_prio_mode == enum.SHORTPRIO.random:
-        db_url_list = db_url_list.order_by(func.random())
+        pivot = random.random()
+        return [
+            db_models.Url.url_random_key < pivot,
+            db_models.Url.url_random_key,
+        ]
 
     elif request.short_term_prio_mode == enum.SHORTPRIO.old_pages_first:
-        db_url_list = db_url_list.order_by(
-            db_models.Url.url_last_visited.asc().nullsfirst()
-        )
+        return db_models.Url.url_last_visited.asc().nullsfirst()
 
     elif request.short_term_prio_mode == enum.SHORTPRIO.new_pages_first:
-        db_url_list = db_url_list.order_by(
-            db_models.Url.url_last_visited.desc().nullslast()
-        )
+        return db_models.Url.url_last_visited.desc().nullslast()
 
     elif request.short_term_prio_mode == enum.SHORTPRIO.pagerank:
-        db_url_list = db_url_list.order_by(
-            db_models.Url.url_pagerank.desc()
-        )
+        return db_models.Url.url_pagerank.desc()
+
+    return None
+
 
-    db_url_list = db_url_list[: request.length] if request.length > 0 else db_url_list
+def ranked_url_query(db, request, fqdn_names):
+    """
+    URLs of all given FQDNs in a single query, ranked per FQDN by the
+    short term prioritization mode and ordered like the given FQDNs
+    """
+    url_rank = (
+        func.row_number()
+        .over(partition_by=db_models.Url.fqdn, order_by=url_order(request))
+        .label("url_rank")
+    )
 
-    return db_url_list
+    ranked_urls = (
+        db.query(db_models.Url, url_rank)
+        .filter(db_models.Url.fqdn.in_(fqdn_names))
+        .subquery()
+    )
+    ranked_url = aliased(db_models.Url, ranked_urls)
+
+    db_url_list = db.query(ranked_url)
+
+    # Limit
+    if request.length > 0:
+        db_url_list = db_url_list.filter(ranked_urls.c.url_rank <= request.length)
+
+    return db_url_list.order_by(
+        func.array_position(array(fqdn_names), ranked_urls.c.fqdn),
+        ranked_urls.c.url_rank,
+    )
+
+
+def short_term_frontiers(db, request, fqdns):
+    url_lists = {fqdn.fqdn: [] for fqdn in fqdns}
+
+    if not url_lists:
+        return url_lists
+
+    for url in ranked_url_query(db, request, list(url_lists.keys())):
+        url_lists[url.fqdn].append(url)
+
+    return url_lists
 
 
 def long_term_frontier(fqdn, url_list):
@@ -116,16 +199,15 @@ def long_term_frontier(fqdn, url_list):
         fqdn_last_ipv6=fqdn.fqdn_last_ipv6,
         fqdn_avg_pagerank=fqdn.fqdn_avg_pagerank,
         fqdn_crawl_delay=fqdn.fqdn_crawl_delay,
-        fqdn_url_count=len(url_list),
+        fqdn_url_count=fqdn.fqdn_url_count,
     )
 
 
 def get_referencing_urls(db, url, amount):
-    return (
-        db.query(db_models.Url)
-        .filter(db_models.Url.url_last_visited is not None)
-        .order_by(func.random())
-        .limit(amount)
+    return random_sample(
+        db.query(db_models.Url).filter(db_models.Url.url_last_visited is not None),
+        db_models.Url.url_random_key,
+        amount,
     )
 
 
@@ -147,44 +229,22 @@ def get_only_new_list_items(new_list, old_list):
     return only_new_list
 
 
-def clean_reservation_list(db):
-    db.query(db_models.FetcherReservation).filter(
-        db_models.FetcherReservation.latest_return < datetime.now(tz=timezone.utc)
-    ).delete()
-
+def save_reservations(db, frontier_response, latest_return):
+    database.reserve_fqdns(
+        db,
+        frontier_response.uuid,
+        get_fqdn_list_from_frontier_response(frontier_response),
+        latest_return,
+    )
     db.commit()
     return True
 
 
-def save_reservations(db, frontier_response, latest_return):
-    uuid = frontier_response.uuid
-    fqdn_only_list = get_fqdn_list_from_frontier_response(frontier_response)
-
-    clean_reservation_list(db)
-
-    current_db_reservation_list = (
-        db.query(db_models.FetcherReservation)
-        .filter(db_models.FetcherReservation.fetcher_uuid == uuid)
-        .filter(
-            db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
-        )
-    )
-    current_block_list = [fqdn.fqdn for fqdn in current_db_reservation_list]
-
-    fqdn_new_block_list = get_only_new_list_items(
-        new_list=fqdn_only_list, old_list=current_block_list
-    )
+def claim_fqdns(db, request, latest_return):
+    if frontier_cache.cache.supports(request):
+        return frontier_cache.cache.claim(request, latest_return)
 
-    new_db_block_list = [
-        db_models.FetcherReservation(
-            fetcher_uuid=str(uuid), fqdn=fqdn, latest_return=latest_return
-        )
-        for fqdn in fqdn_new_block_list
-    ]
-
-    db.bulk_save_objects(new_db_block_list)
-    db.commit()
-    return True
+    return claim_fqdn_list(db, request, latest_return)
 
 
 def get_fqdn_frontier(db, request: pyd_models.FrontierRequest):
@@ -198,25 +258,81 @@ def get_fqdn_frontier(db, request: pyd_models.FrontierRequest):
         long_term_part_mode=request.long_term_part_mode,
     )
 
-    fqdns = create_fqdn_list(db, request)
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=c.hours_to_die)
+
+    fqdns = claim_fqdns(db, request, latest_return)
+    url_lists = short_term_frontiers(db, request, fqdns)
 
     for fqdn in fqdns:
-        url_list = list(short_term_frontier(db, request, fqdn))
+        url_list = url_lists[fqdn.fqdn]
 
         frontier_response.urls_count += len(url_list)
         frontier_response.url_frontiers.append(long_term_frontier(fqdn, url_list))
 
     frontier_response.url_frontiers_count = len(frontier_response.url_frontiers)
 
-    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=c.hours_to_die)
-    save_reservations(db, frontier_response, latest_return)
-
     frontier_response.latest_return = latest_return
     frontier_response.response_url = c.response_url
 
     return frontier_response
 
 
+def stream_url_frontiers(request, frontier_response, fqdns):
+    # The URL count is unknown until the URL lists are read, it is left out
+    yield frontier_response.json(exclude={"urls_count"}) + "\n"
+
+    if not fqdns:
+        return
+
+    db = database.SessionLocal()
+    try:
+        url_list_query = ranked_url_query(
+            db, request, [fqdn.fqdn for fqdn in fqdns]
+        ).yield_per(c.frontier_stream_batch)
+
+        remaining_fqdns = iter(fqdns)
+
+        for fqdn_name, url_list in groupby(url_list_query, key=lambda url: url.fqdn):
+            for fqdn in remaining_fqdns:
+                if fqdn.fqdn == fqdn_name:
+                    yield long_term_frontier(fqdn, list(url_list)).json() + "\n"
+                    break
+
+                yield long_term_frontier(fqdn, []).json() + "\n"
+
+        for fqdn in remaining_fqdns:
+            yield long_term_frontier(fqdn, []).json() + "\n"
+
+    finally:
+        db.close()
+
+
+def get_fqdn_frontier_stream(db, request: pyd_models.FrontierRequest):
+    """
+    Claims the FQDNs like get_fqdn_frontier and returns a generator of NDJSON
+    lines: the response without URL lists and urls_count, followed by one FQDN
+    frontier per line read through a server-side cursor
+    """
+    if not fetchers.uuid_exists(db, str(request.fetcher_uuid)):
+        http_ex.raise_http_404(request.fetcher_uuid)
+
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=c.hours_to_die)
+
+    fqdns = claim_fqdns(db, request, latest_return)
+
+    frontier_response = pyd_models.FrontierResponse(
+        uuid=str(request.fetcher_uuid),
+        short_term_prio_mode=request.short_term_prio_mode,
+        long_term_prio_mode=request.long_term_prio_mode,
+        long_term_part_mode=request.long_term_part_mode,
+        response_url=c.response_url,
+        latest_return=latest_return,
+        url_frontiers_count=len(fqdns),
+    )
+
+    return stream_url_frontiers(request, frontier_response, fqdns)
+
+
 def calculate_avg_freshness(db):
     avg_timestamps = db.query(
         func.to_timestamp(
@@ -271,57 +387,18 @@ def get_fqdn_hash_range(db):
     return round(perc_range, 2)
 
 
-def get_db_stats(db: Session):
-    clean_reservation_list(db)
-    response = {
-        "fetcher_amount": db.query(db_models.Fetcher).count(),
-        "frontier_amount": db.query(db_models.Frontier).count(),
-        "url_amount": db.query(db_models.Url).count(),
-        "url_ref_amount": db.query(db_models.URLRef).count(),
-        "reserved_fqdn_amount": db.query(db_models.FetcherReservation)
-        .filter(
-            db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
-        )
-        .count(),
-        "avg_freshness": calculate_avg_freshness(db),
-        "visited_ratio": get_visited_ratio(db),
-        "fqdn_hash_range": get_fqdn_hash_range(db),
-    }
-    return response
-
-
 def get_random_url(db: Session, amount: int = 1, fqdn: str = None):
     url = db.query(db_models.Url)
     if fqdn is not None:
         url = url.filter(db_models.Url.fqdn == fqdn)
 
-    url = url.order_by(func.random()).limit(amount)
-
-    url_list = [url for url in url]
+    url_list = random_sample(url, db_models.Url.url_random_key, amount)
 
     return pyd_models.RandomUrls(url_list=url_list)
 
 
 def get_fetcher_settings(db: Session) -> pyd_models.FetcherSettings:
-    fetcher_settings = db.query(db_models.FetcherSettings).first()
-    return pyd_models.FetcherSettings(
-        logging_mode=fetcher_settings.logging_mode,
-        crawling_speed_factor=fetcher_settings.crawling_speed_factor,
-        default_crawl_delay=fetcher_settings.default_crawl_delay,
-        parallel_process=fetcher_settings.parallel_process,
-        parallel_fetcher=fetcher_settings.parallel_fetcher,
-        iterations=fetcher_settings.iterations,
-        fqdn_amount=fetcher_settings.fqdn_amount,
-        url_amount=fetcher_settings.url_amount,
-        long_term_prio_mode=fetcher_settings.long_term_prio_mode,
-        long_term_part_mode=fetcher_settings.long_term_part_mode,
-        short_term_prio_mode=fetcher_settings.short_term_prio_mode,
-        min_links_per_page=fetcher_settings.min_links_per_page,
-        max_links_per_page=fetcher_settings.max_links_per_page,
-        lpp_distribution_type=fetcher_settings.lpp_distribution_type,
-        internal_vs_external_threshold=fetcher_settings.internal_vs_external_threshold,
-        new_vs_existing_threshold=fetcher_settings.new_vs_existing_threshold,
-    )
+    return settings_cache.get_settings(db)
 
 
 def settings_exists(db: Session):
@@ -370,7 +447,9 @@ def set_fetcher_settings(request: pyd_models.FetcherSettings, db: Session):
             .first()
         )
 
+    settings_cache.notify(db)
     db.commit()
+    settings_cache.invalidate()
     db.refresh(db_fetcher_settings)
 
     return db_fetcher_settings
@@ -0,0 +1,253 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.sql.expression import func
+
+from app.database import db_models, database
+from app.common import enum, common_values as c
+
+LONGPRIO_KEYS = {
+    enum.LONGPRIO.random: ("fqdn_random_key", False),
+    enum.LONGPRIO.large_sites_first: ("fqdn_url_count", True),
+    enum.LONGPRIO.small_sites_first: ("fqdn_url_count", False),
+    enum.LONGPRIO.avg_pagerank: ("fqdn_avg_pagerank", True),
+    enum.LONGPRIO.old_sites_first: ("fqdn_avg_last_visited_date", False),
+    enum.LONGPRIO.new_sites_first: ("fqdn_avg_last_visited_date", True),
+    enum.LONGPRIO.avg_change_rate: (None, False),
+}
+
+
+def sort_key(fqdn, prio_mode):
+    """
+    Heap key matching the database order, NULLs last ascending and first descending
+    """
+    attribute, descending = LONGPRIO_KEYS[prio_mode]
+    value = getattr(fqdn, attribute) if attribute is not None else 0
+
+    if value is None:
+        return (0, 0) if descending else (1, 0)
+
+    if isinstance(value, datetime):
+        value = value.timestamp()
+
+    return (1, -value) if descending else (0, value)
+
+
+class FrontierCache:
+    """
+    In-process heaps of the unreserved FQDNs per long term prioritization mode.
+
+    The heaps only order the candidates, claims are reserved in the database
+    against the unique FQDN index of the reservations. Candidates reserved by
+    another worker are dropped and skipped until their reservation expires.
+    Every worker holds its own cache, which is resynchronized with the
+    database periodically to pick up changes of other workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_at = None
+
+        self.fqdns = {}
+        self.versions = {}
+        self.heaps = {prio_mode: [] for prio_mode in enum.LONGPRIO}
+
+        self.reservations = {}
+        self.expiries = []
+
+    def supports(self, request):
+        return c.frontier_cache and request.long_term_part_mode == enum.LONGPART.none
+
+    def load(self):
+        db = database.SessionLocal()
+        try:
+            now = datetime.now(tz=timezone.utc)
+            fqdns = db.query(db_models.Frontier).all()
+            reservations = (
+                db.query(
+                    db_models.FetcherReservation.fqdn,
+                    db_models.FetcherReservation.fetcher_uuid,
+                    db_models.FetcherReservation.latest_return,
+                )
+                .filter(db_models.FetcherReservation.latest_return > now)
+                .all()
+            )
+            db.expunge_all()
+        finally:
+            db.close()
+
+        with self.lock:
+            self.fqdns = {}
+            self.versions = {}
+            self.heaps = {prio_mode: [] for prio_mode in enum.LONGPRIO}
+            self.reservations = {
+                fqdn: (uuid, latest_return)
+                for fqdn, uuid, latest_return in reservations
+            }
+            self.expiries = [
+                (latest_return, fqdn) for fqdn, _, latest_return in reservations
+            ]
+            heapq.heapify(self.expiries)
+
+            for fqdn in fqdns:
+                self.fqdns[fqdn.fqdn] = fqdn
+                self.versions[fqdn.fqdn] = 0
+
+            for prio_mode, heap in self.heaps.items():
+                heap.extend((sort_key(fqdn, prio_mode), 0, fqdn.fqdn) for fqdn in fqdns)
+                heapq.heapify(heap)
+
+            self.loaded_at = time.monotonic()
+
+        logging.info("Frontier cache loaded {} FQDNs".format(len(fqdns)))
+
+    def push(self, fqdn):
+        version = self.versions.get(fqdn.fqdn, -1) + 1
+        self.fqdns[fqdn.fqdn] = fqdn
+        self.versions[fqdn.fqdn] = version
+
+        for prio_mode, heap in self.heaps.items():
+            heapq.heappush(heap, (sort_key(fqdn, prio_mode), version, fqdn.fqdn))
+
+    def release(self, fqdn):
+        self.reservations.pop(fqdn, None)
+
+        if fqdn in self.fqdns:
+            self.push(self.fqdns[fqdn])
+
+    def release_expired(self, now):
+        while self.expiries and self.expiries[0][0] <= now:
+            latest_return, fqdn = heapq.heappop(self.expiries)
+            reservation = self.reservations.get(fqdn)
+
+            if reservation is not None and reservation[1] == latest_return:
+                self.release(fqdn)
+
+    def is_stale(self):
+        return (
+            self.loaded_at is None
+            or time.monotonic() - self.loaded_at > c.frontier_cache_resync_seconds
+        )
+
+    def candidates(self, request, latest_return, amount):
+        uuid = str(request.fetcher_uuid)
+        candidates = []
+
+        with self.lock:
+            self.release_expired(datetime.now(tz=timezone.utc))
+            heap = self.heaps[request.long_term_prio_mode]
+
+            while heap and (amount <= 0 or len(candidates) < amount):
+                _, version, fqdn = heapq.heappop(heap)
+
+                if self.versions.get(fqdn) != version or fqdn in self.reservations:
+                    continue
+
+                self.reservations[fqdn] = (uuid, latest_return)
+                heapq.heappush(self.expiries, (latest_return, fqdn))
+                candidates.append(self.fqdns[fqdn])
+
+        return candidates
+
+    def reserve(self, uuid, candidates, latest_return):
+        db = database.SessionLocal()
+        try:
+            reserved = set(
+                database.reserve_fqdns(
+                    db, uuid, [fqdn.fqdn for fqdn in candidates], latest_return
+                )
+            )
+            db.commit()
+
+        except Exception:
+            db.rollback()
+            with self.lock:
+                for fqdn in candidates:
+                    self.release(fqdn.fqdn)
+            raise
+
+        finally:
+            db.close()
+
+        with self.lock:
+            for fqdn in candidates:
+                if fqdn.fqdn not in reserved:
+                    self.reservations[fqdn.fqdn] = (None, latest_return)
+
+        return [fqdn for fqdn in candidates if fqdn.fqdn in reserved]
+
+    def claim(self, request, latest_return):
+        if self.is_stale():
+            self.load()
+
+        claimed = []
+
+        while request.amount <= 0 or len(claimed) < request.amount:
+            candidates = self.candidates(
+                request, latest_return, max(request.amount - len(claimed), 0)
+            )
+
+            if not candidates:
+                break
+
+            claimed.extend(
+                self.reserve(str(request.fetcher_uuid), candidates, latest_return)
+            )
+
+        return claimed
+
+    def refresh_fqdns(self, fqdns):
+        if self.loaded_at is None or not fqdns:
+            return
+
+        db = database.SessionLocal()
+        try:
+            db_fqdns = (
+                db.query(db_models.Frontier)
+                .filter(db_models.Frontier.fqdn.in_(list(fqdns)))
+                .all()
+            )
+            db.expunge_all()
+        finally:
+            db.close()
+
+        with self.lock:
+            for fqdn in db_fqdns:
+                self.push(fqdn)
+
+    def release_fetcher(self, uuid):
+        with self.lock:
+            released = [
+                fqdn
+                for fqdn, reservation in self.reservations.items()
+                if reservation[0] == str(uuid)
+            ]
+
+            for fqdn in released:
+                self.release(fqdn)
+
+    def release_fqdns(self, uuid, fqdns):
+        self.release_reservations([(uuid, fqdn) for fqdn in fqdns])
+
+    def release_reservations(self, reservations):
+        with self.lock:
+            for uuid, fqdn in reservations:
+                reservation = self.reservations.get(fqdn)
+
+                if reservation is not None and reservation[0] == str(uuid):
+                    self.release(fqdn)
+
+    def release_all(self):
+        with self.lock:
+            for fqdn in list(self.reservations):
+                self.release(fqdn)
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+
+cache = FrontierCache()
@@ -0,0 +1,103 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from app.database import db_models
+from app.common import common_values as c
+
+
+class HashRing:
+    """
+    Consistent hashing ring of all fetcher hashes. Every fetcher hash owns the
+    range up to the next fetcher hash, the last one wraps around to the first.
+    """
+
+    def __init__(self, fetcher_hashes):
+        self.hashes = sorted(fetcher_hashes)
+        self.starts = [fetcher_hash for fetcher_hash, _ in self.hashes]
+        self.ranges = defaultdict(list)
+
+        for i, (fetcher_hash, uuid) in enumerate(self.hashes):
+            next_hash = self.starts[(i + 1) % len(self.starts)]
+            self.ranges[uuid].append((uuid, fetcher_hash, next_hash))
+
+    def fetcher_ranges(self, uuid):
+        """
+        ordered by start_hash, ascending
+        """
+        return self.ranges.get(str(uuid), [])
+
+    def owner(self, fqdn_hash):
+        if not self.hashes:
+            return None
+
+        return self.hashes[bisect.bisect_right(self.starts, fqdn_hash) - 1][1]
+
+
+ring_cache = dict(ring=None, loaded_at=None)
+ring_lock = threading.Lock()
+
+
+def load_ring(db):
+    return HashRing(
+        [
+            (f.fetcher_hash, f.fetcher_uuid)
+            for f in db.query(db_models.FetcherHash).all()
+        ]
+    )
+
+
+def get_ring(db):
+    with ring_lock:
+        if (
+            ring_cache["ring"] is None
+            or time.monotonic() - ring_cache["loaded_at"] > c.hash_ring_ttl
+        ):
+            ring_cache["ring"] = load_ring(db)
+            ring_cache["loaded_at"] = time.monotonic()
+
+        return ring_cache["ring"]
+
+
+def get_fetcher_ranges(db, uuid):
+    """
+    Hash ranges of a fetcher, reloading the ring once for fetchers unknown to
+    the cached ring, e.g. registered by another worker
+    """
+    fetcher_ranges = get_ring(db).fetcher_ranges(uuid)
+
+    if not fetcher_ranges:
+        invalidate()
+        fetcher_ranges = get_ring(db).fetcher_ranges(uuid)
+
+    return fetcher_ranges
+
+
+def invalidate():
+    with ring_lock:
+        ring_cache["ring"] = None
+
+
+def ring_delta(old_ring, new_ring):
+    """
+    Hash ranges whose owner differs between two rings,
+    as (start_hash, end_hash, old_uuid, new_uuid)
+    """
+    boundaries = sorted(set(old_ring.starts) | set(new_ring.starts))
+    moved_ranges = []
+
+    for i, start_hash in enumerate(boundaries):
+        end_hash = boundaries[(i + 1) % len(boundaries)]
+        old_uuid = old_ring.owner(start_hash)
+        new_uuid = new_ring.owner(start_hash)
+
+        if old_uuid == new_uuid:
+            continue
+
+        if moved_ranges and moved_ranges[-1][1:] == (start_hash, old_uuid, new_uuid):
+            moved_ranges[-1] = (moved_ranges[-1][0], end_hash, old_uuid, new_uuid)
+        else:
+            moved_ranges.append((start_hash, end_hash, old_uuid, new_uuid))
+
+    return moved_ranges
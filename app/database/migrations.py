@@ -0,0 +1,241 @@
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.sql.expression import func
+
+from app.database import db_models, database
+from app.common import common_values as c
+
+
+def baseline(conn):
+    """
+    Tables of the current models, existing tables are left untouched
+    """
+    db_models.Base.metadata.create_all(bind=conn)
+
+
+def add_random_keys_and_aggregates(conn):
+    """
+    Columns added after the baseline. They are added without a default, a
+    volatile default would rewrite the tables, new rows get it afterwards.
+    """
+    conn.execute(
+        text(
+            "ALTER TABLE frontiers "
+            "ADD COLUMN IF NOT EXISTS fqdn_random_key FLOAT, "
+            "ADD COLUMN IF NOT EXISTS fqdn_pagerank_sum FLOAT, "
+            "ADD COLUMN IF NOT EXISTS fqdn_visited_count INTEGER, "
+            "ADD COLUMN IF NOT EXISTS fqdn_last_visited_sum FLOAT"
+        )
+    )
+    conn.execute(
+        text("ALTER TABLE frontiers ALTER COLUMN fqdn_random_key SET DEFAULT random()")
+    )
+    conn.execute(text("ALTER TABLE urls ADD COLUMN IF NOT EXISTS url_random_key FLOAT"))
+    conn.execute(
+        text("ALTER TABLE urls ALTER COLUMN url_random_key SET DEFAULT random()")
+    )
+
+
+def deduplicate_reservations(conn):
+    """
+    Keeps the latest reservation per FQDN for the unique FQDN index
+    """
+    conn.execute(
+        text(
+            "DELETE FROM fetcher_reservations AS reservation "
+            "USING fetcher_reservations AS newer "
+            "WHERE reservation.fqdn = newer.fqdn "
+            "AND (reservation.latest_return, reservation.fetcher_uuid) "
+            "< (newer.latest_return, newer.fetcher_uuid)"
+        )
+    )
+
+
+def create_indexes(conn):
+    """
+    Indexes missing on existing tables, built concurrently
+    """
+    database.create_missing_indexes(conn)
+
+
+def key_batches(conn, table, key):
+    """
+    Consecutive (first, last) key ranges of migration_batch_size rows
+    """
+    last = None
+
+    while True:
+        keys = [
+            row[0]
+            for row in conn.execute(
+                text(
+                    "SELECT {key} FROM {table} "
+                    "WHERE :last IS NULL OR {key} > :last "
+                    "ORDER BY {key} LIMIT :batch_size".format(key=key, table=table)
+                ),
+                last=last,
+                batch_size=c.migration_batch_size,
+            )
+        ]
+
+        if not keys:
+            return
+
+        yield keys[0], keys[-1]
+        last = keys[-1]
+
+
+def backfill_random_keys(conn):
+    """
+    Random keys of rows created before the columns, in batches
+    """
+    for table, key, random_key in [
+        ("frontiers", "fqdn", "fqdn_random_key"),
+        ("urls", "url", "url_random_key"),
+    ]:
+        for first, last in key_batches(conn, table, key):
+            conn.execute(
+                text(
+                    "UPDATE {table} SET {random_key} = random() "
+                    "WHERE {key} BETWEEN :first AND :last "
+                    "AND {random_key} IS NULL".format(
+                        table=table, key=key, random_key=random_key
+                    )
+                ),
+                first=first,
+                last=last,
+            )
+
+
+def backfill_aggregates(conn):
+    """
+    Running sums and averages of FQDNs without aggregates, computed from
+    their URLs in batches of FQDNs
+    """
+    for first, last in key_batches(conn, "frontiers", "fqdn"):
+        conn.execute(
+            text(
+                "UPDATE frontiers SET "
+                "fqdn_url_count = url_aggregates.url_count, "
+                "fqdn_pagerank_sum = url_aggregates.pagerank_sum, "
+                "fqdn_avg_pagerank = url_aggregates.pagerank_sum "
+                "/ url_aggregates.url_count, "
+                "fqdn_visited_count = url_aggregates.visited_count, "
+                "fqdn_last_visited_sum = url_aggregates.last_visited_sum, "
+                "fqdn_avg_last_visited_date = to_timestamp("
+                "url_aggregates.last_visited_sum "
+                "/ nullif(url_aggregates.visited_count, 0)) "
+                "FROM ("
+                "SELECT fqdn, count(*) AS url_count, "
+                "coalesce(sum(url_pagerank), 0) AS pagerank_sum, "
+                "count(url_last_visited) AS visited_count, "
+                "coalesce(sum(extract(epoch FROM url_last_visited)), 0) "
+                "AS last_visited_sum "
+                "FROM urls WHERE fqdn BETWEEN :first AND :last GROUP BY fqdn"
+                ") AS url_aggregates "
+                "WHERE frontiers.fqdn = url_aggregates.fqdn "
+                "AND frontiers.fqdn_pagerank_sum IS NULL"
+            ),
+            first=first,
+            last=last,
+        )
+
+
+def backfill_columns(conn):
+    backfill_random_keys(conn)
+    backfill_aggregates(conn)
+
+
+# (revision, description, migration, autocommit)
+# Autocommit migrations run on the locked autocommit connection instead of a
+# transaction, for CREATE INDEX CONCURRENTLY and batches committed one by one
+revisions = [
+    (1, "baseline", baseline, False),
+    (2, "random key and aggregate columns", add_random_keys_and_aggregates, False),
+    (3, "one reservation per fqdn", deduplicate_reservations, False),
+    (4, "indexes of existing tables", create_indexes, True),
+    (5, "backfill random keys and aggregates", backfill_columns, True),
+]
+
+head_revision = revisions[-1][0]
+
+
+def current_revision(conn):
+    if not conn.dialect.has_table(conn, db_models.SchemaVersion.__tablename__):
+        return 0
+
+    return (
+        conn.execute(func.max(db_models.SchemaVersion.revision).select()).scalar() or 0
+    )
+
+
+def record_revision(conn, revision, description):
+    conn.execute(
+        db_models.SchemaVersion.__table__.insert().values(
+            revision=revision,
+            description=description,
+            applied_date=datetime.now(tz=timezone.utc),
+        )
+    )
+
+
+def upgrade(bind=database.engine):
+    """
+    Applies all pending revisions in order and returns their numbers.
+    Concurrent upgrades are serialized by an advisory lock
+    """
+    with bind.connect() as conn:
+        if current_revision(conn) == head_revision:
+            return []
+
+    applied = []
+
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        lock.execute(text("SELECT pg_advisory_lock(:key)"), key=c.schema_lock_key)
+        lock.execute(text("SET statement_timeout = 0"))
+
+        try:
+            db_models.SchemaVersion.__table__.create(bind=lock, checkfirst=True)
+            revision = current_revision(lock)
+
+            for number, description, migration, autocommit in revisions:
+                if number <= revision:
+                    continue
+
+                logging.info("Migrating schema to revision {}".format(number))
+
+                if autocommit:
+                    migration(lock)
+                    record_revision(lock, number, description)
+                else:
+                    with bind.begin() as conn:
+                        conn.execute(text("SET LOCAL statement_timeout = 0"))
+                        migration(conn)
+                        record_revision(conn, number, description)
+
+                applied.append(number)
+
+        finally:
+            lock.execute(
+                text("SELECT pg_advisory_unlock(:key)"), key=c.schema_lock_key
+            )
+
+    return applied
+
+
+def migrate():
+    """
+    Schema work at startup, skipped unless SCHEMA_MIGRATION is upgrade.
+    Deployments run the migrations once with python -m app.database.migrations
+    """
+    if c.schema_migration == "upgrade":
+        return upgrade()
+
+    return []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Applied revisions: {}".format(upgrade() or "none"))
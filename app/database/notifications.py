@@ -0,0 +1,75 @@
+import logging
+import select
+import threading
+
+from sqlalchemy import text
+
+from app.common import common_values as c
+
+
+def notify(db, channel):
+    """
+    Notifies all workers on the channel once the transaction commits
+    """
+    db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": channel})
+
+
+class NotificationListener:
+    """
+    Background thread calling the subscribed callbacks on notifications of
+    other workers, and all of them after (re)connecting, as notifications
+    may have been missed in between.
+    """
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.callbacks = {}
+
+    def subscribe(self, channel, callback):
+        self.callbacks[channel] = callback
+
+    def listen(self, bind):
+        connection = bind.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.connection
+
+        try:
+            dbapi_connection.rollback()
+            dbapi_connection.autocommit = True
+            for channel, callback in self.callbacks.items():
+                dbapi_connection.cursor().execute("LISTEN {}".format(channel))
+                callback()
+
+            while not self.stop_event.is_set():
+                if select.select([dbapi_connection], [], [], 1) == ([], [], []):
+                    continue
+
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notification = dbapi_connection.notifies.pop(0)
+                    self.callbacks[notification.channel]()
+
+        finally:
+            connection.close()
+
+    def run(self, bind):
+        while not self.stop_event.is_set():
+            try:
+                self.listen(bind)
+
+            except Exception:
+                logging.exception("Notification listener lost its connection")
+                self.stop_event.wait(c.notification_reconnect_seconds)
+
+    def start(self, bind):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, args=(bind,), daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+listener = NotificationListener()
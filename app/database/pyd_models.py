@@ -85,11 +85,15 @@ class Frontier(BasisModel):
 
 
 class URLReference(BasisModel):
-    url_out: str
-    url_in: str
+    url_out: HttpUrl
+    url_in: HttpUrl
     date: datetime
 
 
+class URLReferenceBatch(BasisModel):
+    url_refs: List[URLReference]
+
+
 class FrontierResponse(BasisModel):
     uuid: str
 
@@ -112,6 +116,17 @@ class SubmitFrontier(BasisModel):
     fqdns: List[Frontier]
     url_count: int
     urls: List[Url] = []
+    url_refs: List[URLReference] = []
+
+
+class SubmitResponse(BasisModel):
+    uuid: str
+
+    visited_url_count: int = 0
+    new_fqdn_count: int = 0
+    new_url_count: int = 0
+    new_url_ref_count: int = 0
+    released_fqdn_count: int = 0
 
 
 # Developer Tools
@@ -124,6 +139,9 @@ class GenerateRequest(BasisModel):
     visited_ratio: float = c.visited_ratio
     connection_amount: int = c.connections
     fixed_crawl_delay: int = None
+    bulk: bool = False
+    seed: int = None
+    processes: int = 1
 
 
 class StatsResponse(BasisModel):
@@ -138,6 +156,49 @@ class StatsResponse(BasisModel):
     visited_ratio: float
     fqdn_hash_range: float
 
+    approximate: bool = None
+    sample_size: int = None
+    visited_ratio_error: float = None
+    avg_freshness_error_seconds: float = None
+
+
+class FetcherBalance(BasisModel):
+    uuid: UUID
+    fqdn_amount: int
+    url_amount: int
+    reserved_fqdn_amount: int
+    backlog_url_amount: int
+
+
+class PartitionBalance(BasisModel):
+    long_term_part_mode: enum.LONGPART
+    fetchers: List[FetcherBalance] = []
+
+
+class ReaperStats(BasisModel):
+    worker_pid: int
+    interval_seconds: int
+    runs: int
+    last_run: datetime = None
+    last_released: int
+    total_released: int
+
+
+class URLReferenceStats(BasisModel):
+    worker_pid: int
+    queued: int
+    capacity: int
+    written: int
+    failed: int
+
+
+class PoolStats(BasisModel):
+    worker_pid: int
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
 
 class DeleteDatabase(BasisModel):
     delete_url_refs: bool = False
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import tuple_
+
+from app.database import db_models, database
+from app.common import common_values as c
+
+
+class ReservationReaper:
+    """
+    Background thread deleting expired fetcher reservations in batches.
+    Every worker runs its own reaper, its statistics cover only this worker.
+    """
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.runs = 0
+        self.last_run = None
+        self.last_released = 0
+        self.total_released = 0
+
+    def reap(self, db):
+        if c.reaper_batch_size <= 0:
+            raise ValueError("RESERVATION_REAPER_BATCH must be positive")
+
+        now = datetime.now(tz=timezone.utc)
+        released = 0
+
+        while True:
+            expired_reservations = (
+                db.query(
+                    db_models.FetcherReservation.fetcher_uuid,
+                    db_models.FetcherReservation.fqdn,
+                )
+                .filter(db_models.FetcherReservation.latest_return < now)
+                .limit(c.reaper_batch_size)
+                .with_for_update(skip_locked=True)
+            )
+
+            batch_released = (
+                db.query(db_models.FetcherReservation)
+                .filter(
+                    tuple_(
+                        db_models.FetcherReservation.fetcher_uuid,
+                        db_models.FetcherReservation.fqdn,
+                    ).in_(expired_reservations)
+                )
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+
+            released += batch_released
+            if batch_released < c.reaper_batch_size:
+                break
+
+        self.runs += 1
+        self.last_run = now
+        self.last_released = released
+        self.total_released += released
+
+        return released
+
+    def run(self):
+        while not self.stop_event.wait(c.reaper_interval_seconds):
+            db = database.SessionLocal()
+            try:
+                released = self.reap(db)
+                logging.info("Reaper released {} reservations".format(released))
+
+            except Exception:
+                db.rollback()
+                logging.exception("Reaper failed to release reservations")
+
+            finally:
+                db.close()
+
+    def start(self):
+        if c.reaper_interval_seconds <= 0:
+            return
+
+        if c.reaper_batch_size <= 0:
+            logging.warning(
+                "Reaper not started, RESERVATION_REAPER_BATCH must be positive"
+            )
+            return
+
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_stats(self):
+        return dict(
+            worker_pid=os.getpid(),
+            interval_seconds=c.reaper_interval_seconds,
+            runs=self.runs,
+            last_run=self.last_run,
+            last_released=self.last_released,
+            total_released=self.total_released,
+        )
+
+
+reaper = ReservationReaper()
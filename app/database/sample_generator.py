@@ -1,10 +1,15 @@
+import io
+import multiprocessing
 import random
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
 from uuid import uuid4
 
 from sqlalchemy.orm import Session
 
-from app.database import db_models, frontier
+from app.database import db_models, frontier, hash_ring, aggregates, fetcher_registry
+from app.database import database
 from app.common import random_data_generator as rand_gen
 from app.common import common_values as c
 from app.data import data_generator as data_gen
@@ -45,6 +50,9 @@ def create_sample_fetcher(db: Session, amount: int = 3):
     db.bulk_save_objects(fetcher_hashes)
     db.commit()
 
+    fetcher_registry.changed(db)
+    hash_ring.invalidate()
+
     for fetcher in fetchers:
         db.refresh(fetcher)
 
@@ -109,17 +117,14 @@ def create_sample_frontier(db: Session, request):
     db.bulk_save_objects(fqdn_frontier)
     db.commit()
 
-    for fqdn in fqdn_bases:
-        urls = rand_gen.random_urls(fqdn, fqdn_url_amounts[fqdn_bases.index(fqdn)])
+    for fqdn, fqdn_url_amount in zip(fqdn_bases, fqdn_url_amounts):
+        urls = rand_gen.random_urls(fqdn, fqdn_url_amount)
 
-        fqdn_url_list = [
-            new_url(urls[i], fqdn, request)
-            for i in range(fqdn_url_amounts[fqdn_bases.index(fqdn)])
-        ]
+        fqdn_url_list = [new_url(url, fqdn, request) for url in urls]
 
         db.bulk_save_objects(fqdn_url_list)
         db.query(db_models.Frontier).filter(db_models.Frontier.fqdn == fqdn).update(
-            {"fqdn_avg_last_visited_date": avg_dates(fqdn_url_list)}
+            aggregates.url_list_aggregates(fqdn_url_list), synchronize_session=False
         )
 
         db.commit()
@@ -143,12 +148,231 @@ def create_sample_frontier(db: Session, request):
     return {"frontier": fqdn_frontier, "url_list": global_url_list}
 
 
-def avg_dates(url_list):
-    any_ref_date = datetime(2000, 1, 1)
-    dated_url_list = [url for url in url_list if url.url_last_visited is not None]
+frontier_columns = [
+    "fqdn",
+    "tld",
+    "fqdn_hash",
+    "fqdn_hash_fetcher_index",
+    "fqdn_last_ipv4",
+    "fqdn_last_ipv6",
+    "fqdn_url_count",
+    "fqdn_pagerank_sum",
+    "fqdn_avg_pagerank",
+    "fqdn_visited_count",
+    "fqdn_last_visited_sum",
+    "fqdn_avg_last_visited_date",
+    "fqdn_crawl_delay",
+]
+url_columns = [
+    "url",
+    "fqdn",
+    "url_pagerank",
+    "url_last_visited",
+    "url_blacklisted",
+    "url_bot_excluded",
+]
+url_ref_columns = ["url_out", "url_in", "parsing_date"]
+
+
+def copy_rows(db: Session, model, columns, rows):
+    """
+    Writes the rows with COPY from an in-memory text buffer
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    db.connection().connection.cursor().copy_expert(
+        "COPY {} ({}) FROM STDIN".format(model.__tablename__, ", ".join(columns)),
+        buffer,
+    )
+
+
+def unique_fqdns(amount):
+    fqdns = dict()
+    while len(fqdns) < amount:
+        fqdns[rand_gen.get_random_fqdn()] = None
+    return list(fqdns)
+
+
+def new_url_row(url, fqdn, request, dates_end=None):
+    if random.random() < request.visited_ratio:
+        generated_date_time = rand_gen.random_datetime(end=dates_end)
+    else:
+        generated_date_time = None
+
+    return (url, fqdn, data_gen.random_pagerank(), generated_date_time, False, False)
+
+
+def new_fqdn_row(fqdn_basis, url_rows, fetcher_amount, request):
+    deltas = aggregates.new_deltas()
+    for _, _, url_pagerank, url_last_visited, _, _ in url_rows:
+        aggregates.add_url(deltas, fqdn_basis, url_pagerank, url_last_visited)
+    delta = deltas[fqdn_basis]
+
+    avg_last_visited_date = None
+    if delta["visited_count"]:
+        avg_last_visited_date = datetime.fromtimestamp(
+            delta["last_visited_sum"] / delta["visited_count"], tz=timezone.utc
+        )
+
+    crawl_delay = request.fixed_crawl_delay
+    if crawl_delay is None:
+        crawl_delay = data_gen.random_crawl_delay()
+
+    fqdn_hash = data_gen.generate_hash(fqdn_basis)
+    return (
+        fqdn_basis,
+        fqdn_basis.split(".")[-1],
+        fqdn_hash,
+        fqdn_hash % fetcher_amount if fetcher_amount != 0 else None,
+        rand_gen.get_random_ipv4(),
+        rand_gen.random_example_ipv6(),
+        delta["url_count"],
+        delta["pagerank_sum"],
+        delta["pagerank_sum"] / delta["url_count"] if delta["url_count"] else None,
+        delta["visited_count"],
+        delta["last_visited_sum"],
+        avg_last_visited_date,
+        crawl_delay,
+    )
+
+
+class UrlPool:
+    """
+    Uniform sample of at most generate_url_pool_size of all added URLs, by
+    reservoir sampling, as link sources of the bulk generator
+    """
+
+    def __init__(self):
+        self.urls = []
+        self.added = 0
+
+    def add(self, url):
+        self.added += 1
+
+        if len(self.urls) < c.generate_url_pool_size:
+            self.urls.append(url)
+        else:
+            i = random.randrange(self.added)
+            if i < c.generate_url_pool_size:
+                self.urls[i] = url
+
+    def sample(self, amount):
+        return random.sample(self.urls, min(amount, len(self.urls)))
+
+
+def create_sample_frontier_bulk(
+    db: Session, request, fetcher_amount=None, dates_end=None
+):
+    """
+    Generates the FQDNs, URLs and URL references like create_sample_frontier,
+    but writes them with COPY in chunks of about generate_copy_chunk URLs.
+    URL references link to a pool of the generated URLs instead of
+    querying random URLs of the database.
+    """
+    if fetcher_amount is None:
+        fetcher_amount = db.query(db_models.Fetcher).count()
+
+    fqdn_rows, url_rows, url_ref_rows = [], [], []
+    url_pool = UrlPool()
+    counts = dict(fqdn_amount=0, url_amount=0, url_ref_amount=0)
+
+    def flush():
+        copy_rows(db, db_models.Frontier, frontier_columns, fqdn_rows)
+        copy_rows(db, db_models.Url, url_columns, url_rows)
+        copy_rows(db, db_models.URLRef, url_ref_columns, url_ref_rows)
+        db.commit()
+
+        counts["fqdn_amount"] += len(fqdn_rows)
+        counts["url_amount"] += len(url_rows)
+        counts["url_ref_amount"] += len(url_ref_rows)
+        fqdn_rows.clear()
+        url_rows.clear()
+        url_ref_rows.clear()
+
+    for fqdn in unique_fqdns(request.fqdn_amount):
+        fqdn_url_amount = random.randint(request.min_url_amount, request.max_url_amount)
+        fqdn_url_rows = [
+            new_url_row(url, fqdn, request, dates_end)
+            for url in rand_gen.random_urls(fqdn, fqdn_url_amount)
+        ]
+
+        fqdn_rows.append(new_fqdn_row(fqdn, fqdn_url_rows, fetcher_amount, request))
+        url_rows.extend(fqdn_url_rows)
+
+        for url_row in fqdn_url_rows:
+            url_pool.add(url_row[0])
+
+        # URL Links
+        if request.connection_amount > 0:
+            for url_row in fqdn_url_rows:
+                url_ref_rows.extend(
+                    (url_out, url_row[0], rand_gen.random_datetime(end=dates_end))
+                    for url_out in url_pool.sample(request.connection_amount)
+                )
+
+        if len(url_rows) >= c.generate_copy_chunk:
+            flush()
+
+    flush()
+
+    return counts
 
-    avg_date = any_ref_date + sum(
-        [url.url_last_visited - any_ref_date for url in dated_url_list], timedelta()
-    ) / len(url_list)
 
-    return avg_date
+def create_sample_shard(request, shard, fqdn_amount, fetcher_amount, dates_end):
+    """
+    Generates one shard in a worker process, on its own connections and
+    seeded by the request seed and the shard number
+    """
+    database.engine.dispose()
+
+    if request.seed is not None:
+        random.seed("{}-{}".format(request.seed, shard))
+
+    db = database.SessionLocal()
+    try:
+        return create_sample_frontier_bulk(
+            db,
+            request.copy(update={"fqdn_amount": fqdn_amount}),
+            fetcher_amount=fetcher_amount,
+            dates_end=dates_end,
+        )
+    finally:
+        db.close()
+
+
+def create_sample_frontier_parallel(db: Session, request):
+    """
+    Generates the frontier in shards of generate_shard_size FQDNs on a pool of
+    request.processes worker processes. The shards do not depend on the
+    number of processes, so a seed gives the same FQDNs, URLs and URL
+    references, as the visiting dates end at generate_seeded_dates_end
+    """
+    fetcher_amount = db.query(db_models.Fetcher).count()
+    dates_end = c.generate_seeded_dates_end if request.seed is not None else None
+    shard_fqdn_amounts = [
+        min(c.generate_shard_size, request.fqdn_amount - first_fqdn)
+        for first_fqdn in range(0, request.fqdn_amount, c.generate_shard_size)
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=request.processes, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        shard_counts = list(
+            executor.map(
+                create_sample_shard,
+                repeat(request),
+                range(len(shard_fqdn_amounts)),
+                shard_fqdn_amounts,
+                repeat(fetcher_amount),
+                repeat(dates_end),
+            )
+        )
+
+    return {
+        key: sum(counts[key] for counts in shard_counts)
+        for key in ["fqdn_amount", "url_amount", "url_ref_amount"]
+    }
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from app.database import db_models, pyd_models, notifications
+from app.common import common_values as c
+
+
+settings_cache = dict(settings=None, loaded_at=None)
+settings_lock = threading.Lock()
+
+
+def load_settings(db):
+    fetcher_settings = db.query(db_models.FetcherSettings).first()
+
+    if fetcher_settings is None:
+        return None
+
+    return pyd_models.FetcherSettings(
+        logging_mode=fetcher_settings.logging_mode,
+        crawling_speed_factor=fetcher_settings.crawling_speed_factor,
+        default_crawl_delay=fetcher_settings.default_crawl_delay,
+        parallel_process=fetcher_settings.parallel_process,
+        parallel_fetcher=fetcher_settings.parallel_fetcher,
+        iterations=fetcher_settings.iterations,
+        fqdn_amount=fetcher_settings.fqdn_amount,
+        url_amount=fetcher_settings.url_amount,
+        long_term_prio_mode=fetcher_settings.long_term_prio_mode,
+        long_term_part_mode=fetcher_settings.long_term_part_mode,
+        short_term_prio_mode=fetcher_settings.short_term_prio_mode,
+        min_links_per_page=fetcher_settings.min_links_per_page,
+        max_links_per_page=fetcher_settings.max_links_per_page,
+        lpp_distribution_type=fetcher_settings.lpp_distribution_type,
+        internal_vs_external_threshold=fetcher_settings.internal_vs_external_threshold,
+        new_vs_existing_threshold=fetcher_settings.new_vs_existing_threshold,
+    )
+
+
+def get_settings(db):
+    """
+    The fetcher settings, reloaded after a change notification or after
+    settings_cache_ttl seconds, which bounds staleness while the notification
+    listener reconnects. None while no settings exist.
+    """
+    with settings_lock:
+        if (
+            settings_cache["settings"] is None
+            or time.monotonic() - settings_cache["loaded_at"] > c.settings_cache_ttl
+        ):
+            settings_cache["settings"] = load_settings(db)
+            settings_cache["loaded_at"] = time.monotonic()
+
+        return settings_cache["settings"]
+
+
+def invalidate():
+    with settings_lock:
+        settings_cache["settings"] = None
+
+
+def notify(db):
+    notifications.notify(db, c.settings_channel)
+
+
+notifications.listener.subscribe(c.settings_channel, invalidate)
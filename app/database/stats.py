@@ -0,0 +1,349 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import false, tablesample, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import func
+
+from app.database import db_models, pyd_models
+from app.common import common_values as c, enum
+
+
+# approximate -> (loaded_at, stats)
+stats_cache = {}
+stats_lock = threading.Lock()
+
+
+def query_stats(db: Session):
+    """
+    All statistics in one statement, which reads every table once
+    """
+    url_stats = db.query(
+        func.count().label("url_amount"),
+        func.count(db_models.Url.url_last_visited).label("visited_amount"),
+        func.to_timestamp(
+            func.avg(func.extract("epoch", db_models.Url.url_last_visited))
+        ).label("avg_last_visited"),
+    ).subquery()
+
+    hash_index_counts = (
+        db.query(func.count().label("fqdn_amount"))
+        .select_from(db_models.Frontier)
+        .group_by(db_models.Frontier.fqdn_hash_fetcher_index)
+        .subquery()
+    )
+    fqdn_stats = db.query(
+        func.coalesce(func.sum(hash_index_counts.c.fqdn_amount), 0).label(
+            "frontier_amount"
+        ),
+        func.min(hash_index_counts.c.fqdn_amount).label("min_hash_index_amount"),
+        func.max(hash_index_counts.c.fqdn_amount).label("max_hash_index_amount"),
+        func.avg(hash_index_counts.c.fqdn_amount).label("avg_hash_index_amount"),
+    ).subquery()
+
+    return db.query(
+        db.query(func.count(db_models.Fetcher.uuid)).label("fetcher_amount"),
+        fqdn_stats,
+        url_stats,
+        db.query(func.count(db_models.URLRef.url_out)).label("url_ref_amount"),
+        db.query(func.count(db_models.FetcherReservation.fqdn))
+        .filter(
+            db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
+        )
+        .label("reserved_fqdn_amount"),
+    ).one()
+
+
+def format_timestamp(timestamp):
+    if timestamp is None:
+        return "None"
+
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def get_fqdn_hash_range(row):
+    if not row.avg_hash_index_amount:
+        return 0.0
+
+    hash_range = row.max_hash_index_amount - row.min_hash_index_amount
+    return round((hash_range / 2) / float(row.avg_hash_index_amount), 2)
+
+
+def get_db_stats(db: Session):
+    row = query_stats(db)
+
+    return {
+        "fetcher_amount": row.fetcher_amount,
+        "frontier_amount": int(row.frontier_amount),
+        "url_amount": row.url_amount,
+        "url_ref_amount": row.url_ref_amount,
+        "reserved_fqdn_amount": row.reserved_fqdn_amount,
+        "avg_freshness": format_timestamp(row.avg_last_visited),
+        "visited_ratio": row.visited_amount / row.url_amount if row.url_amount else 0.0,
+        "fqdn_hash_range": get_fqdn_hash_range(row),
+    }
+
+
+def estimated_rows(db: Session):
+    """
+    Row estimates of the planner by table name, -1 for never analyzed tables
+    """
+    return dict(
+        db.execute(
+            text(
+                "SELECT relname, reltuples FROM pg_class "
+                "WHERE relkind = 'r' AND relname = ANY(:table_names)"
+            ),
+            {
+                "table_names": [
+                    model.__tablename__
+                    for model in [
+                        db_models.Fetcher,
+                        db_models.Frontier,
+                        db_models.Url,
+                        db_models.URLRef,
+                    ]
+                ]
+            },
+        ).fetchall()
+    )
+
+
+def approximate_count(db: Session, model, estimates):
+    """
+    The planner estimate, or the exact count for small or never analyzed tables
+    """
+    estimate = estimates.get(model.__tablename__, -1)
+
+    if estimate < c.stats_exact_threshold:
+        return db.query(func.count()).select_from(model).scalar()
+
+    return int(estimate)
+
+
+def sample(model, estimate):
+    """
+    A TABLESAMPLE SYSTEM of about stats_sample_size rows, the full table while
+    it is small or not analyzed yet
+    """
+    if estimate <= 0 or estimate < c.stats_exact_threshold:
+        return model.__table__
+
+    percent = min(100.0, 100.0 * c.stats_sample_size / estimate)
+    return tablesample(model.__table__, percent)
+
+
+def get_approximate_db_stats(db: Session):
+    """
+    Counts from the planner estimates, the other figures from samples of
+    urls and frontiers with the half-widths of their 95% confidence intervals.
+    The intervals assume independent rows, a SYSTEM sample draws whole pages.
+    """
+    estimates = estimated_rows(db)
+
+    url_sample = sample(db_models.Url, estimates.get(db_models.Url.__tablename__, -1))
+    last_visited_epoch = func.extract("epoch", url_sample.c.url_last_visited)
+    url_stats = db.query(
+        func.count().label("url_amount"),
+        func.count(url_sample.c.url_last_visited).label("visited_amount"),
+        func.avg(last_visited_epoch).label("avg_epoch"),
+        func.stddev_samp(last_visited_epoch).label("stddev_epoch"),
+    ).one()
+
+    fqdn_sample = sample(
+        db_models.Frontier, estimates.get(db_models.Frontier.__tablename__, -1)
+    )
+    hash_index_counts = (
+        db.query(func.count().label("fqdn_amount"))
+        .select_from(fqdn_sample)
+        .group_by(fqdn_sample.c.fqdn_hash_fetcher_index)
+        .subquery()
+    )
+    fqdn_stats = db.query(
+        func.min(hash_index_counts.c.fqdn_amount).label("min_hash_index_amount"),
+        func.max(hash_index_counts.c.fqdn_amount).label("max_hash_index_amount"),
+        func.avg(hash_index_counts.c.fqdn_amount).label("avg_hash_index_amount"),
+    ).one()
+
+    visited_ratio = visited_ratio_error = None
+    if url_stats.url_amount:
+        visited_ratio = url_stats.visited_amount / url_stats.url_amount
+        visited_ratio_error = 1.96 * math.sqrt(
+            visited_ratio * (1 - visited_ratio) / url_stats.url_amount
+        )
+
+    avg_freshness_error = None
+    if url_stats.stddev_epoch is not None:
+        avg_freshness_error = (
+            1.96 * float(url_stats.stddev_epoch) / math.sqrt(url_stats.visited_amount)
+        )
+
+    return {
+        "fetcher_amount": approximate_count(db, db_models.Fetcher, estimates),
+        "frontier_amount": approximate_count(db, db_models.Frontier, estimates),
+        "url_amount": approximate_count(db, db_models.Url, estimates),
+        "url_ref_amount": approximate_count(db, db_models.URLRef, estimates),
+        "reserved_fqdn_amount": db.query(db_models.FetcherReservation)
+        .filter(
+            db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
+        )
+        .count(),
+        "avg_freshness": format_timestamp(
+            None
+            if url_stats.avg_epoch is None
+            else datetime.fromtimestamp(float(url_stats.avg_epoch), tz=timezone.utc)
+        ),
+        "visited_ratio": visited_ratio or 0.0,
+        "fqdn_hash_range": get_fqdn_hash_range(fqdn_stats),
+        "approximate": True,
+        "sample_size": url_stats.url_amount,
+        "visited_ratio_error": visited_ratio_error,
+        "avg_freshness_error_seconds": avg_freshness_error,
+    }
+
+
+def get_cached_db_stats(db: Session, approximate: bool = False):
+    """
+    The exact or approximate statistics, computed at most once per
+    stats_cache_ttl seconds
+    """
+    compute_stats = get_approximate_db_stats if approximate else get_db_stats
+
+    if c.stats_cache_ttl <= 0:
+        return compute_stats(db)
+
+    with stats_lock:
+        loaded_at, cached_stats = stats_cache.get(approximate, (None, None))
+
+        if cached_stats is None or time.monotonic() - loaded_at > c.stats_cache_ttl:
+            cached_stats = compute_stats(db)
+            stats_cache[approximate] = (time.monotonic(), cached_stats)
+
+        return cached_stats
+
+
+def fqdn_owners(db: Session, long_term_part_mode):
+    """
+    The fetcher owning each FQDN under the partitioning mode, with the URL
+    counters of the FQDN. Nothing is owned without partitioning.
+    """
+    fqdn_counters = [
+        db_models.Frontier.fqdn_url_count.label("url_count"),
+        db_models.Frontier.fqdn_visited_count.label("visited_count"),
+    ]
+
+    if long_term_part_mode == enum.LONGPART.top_level_domain:
+        return db.query(
+            db_models.Fetcher.uuid.label("fetcher_uuid"), *fqdn_counters
+        ).join(
+            db_models.Frontier,
+            db_models.Frontier.tld == db_models.Fetcher.tld_preference,
+        )
+
+    if long_term_part_mode == enum.LONGPART.fqdn_hash:
+        fetcher_indexes = db.query(
+            db_models.Fetcher.uuid,
+            (func.row_number().over(order_by=db_models.Fetcher.reg_date) - 1).label(
+                "fetcher_index"
+            ),
+        ).subquery()
+
+        return db.query(
+            fetcher_indexes.c.uuid.label("fetcher_uuid"), *fqdn_counters
+        ).join(
+            db_models.Frontier,
+            db_models.Frontier.fqdn_hash_fetcher_index
+            == fetcher_indexes.c.fetcher_index,
+        )
+
+    if long_term_part_mode == enum.LONGPART.consistent_hashing:
+        # The fetcher hash at or below the FQDN hash, below the first fetcher
+        # hash the range wraps around to the last one, as in HashRing.owner
+        owner_hashes = db.query(db_models.FetcherHash.fetcher_uuid).order_by(
+            db_models.FetcherHash.fetcher_hash.desc()
+        )
+        owner = func.coalesce(
+            owner_hashes.filter(
+                db_models.FetcherHash.fetcher_hash <= db_models.Frontier.fqdn_hash
+            )
+            .limit(1)
+            .as_scalar(),
+            owner_hashes.limit(1).as_scalar(),
+        )
+
+        return db.query(owner.label("fetcher_uuid"), *fqdn_counters)
+
+    return db.query(
+        db_models.Fetcher.uuid.label("fetcher_uuid"), *fqdn_counters
+    ).filter(false())
+
+
+def get_partition_balance(db: Session, long_term_part_mode):
+    """
+    FQDNs, URLs, active reservations and unvisited URLs per fetcher, in one
+    grouped query over the URL counters of the FQDNs
+    """
+    owners = fqdn_owners(db, long_term_part_mode).subquery()
+    partition_stats = (
+        db.query(
+            owners.c.fetcher_uuid,
+            func.count().label("fqdn_amount"),
+            func.sum(func.coalesce(owners.c.url_count, 0)).label("url_amount"),
+            func.sum(
+                func.coalesce(owners.c.url_count, 0)
+                - func.coalesce(owners.c.visited_count, 0)
+            ).label("backlog_url_amount"),
+        )
+        .group_by(owners.c.fetcher_uuid)
+        .subquery()
+    )
+    reservation_stats = (
+        db.query(
+            db_models.FetcherReservation.fetcher_uuid,
+            func.count().label("reserved_fqdn_amount"),
+        )
+        .filter(
+            db_models.FetcherReservation.latest_return > datetime.now(tz=timezone.utc)
+        )
+        .group_by(db_models.FetcherReservation.fetcher_uuid)
+        .subquery()
+    )
+
+    fetcher_balances = (
+        db.query(
+            db_models.Fetcher.uuid,
+            func.coalesce(partition_stats.c.fqdn_amount, 0).label("fqdn_amount"),
+            func.coalesce(partition_stats.c.url_amount, 0).label("url_amount"),
+            func.coalesce(reservation_stats.c.reserved_fqdn_amount, 0).label(
+                "reserved_fqdn_amount"
+            ),
+            func.coalesce(partition_stats.c.backlog_url_amount, 0).label(
+                "backlog_url_amount"
+            ),
+        )
+        .outerjoin(
+            partition_stats, partition_stats.c.fetcher_uuid == db_models.Fetcher.uuid
+        )
+        .outerjoin(
+            reservation_stats,
+            reservation_stats.c.fetcher_uuid == db_models.Fetcher.uuid,
+        )
+        .order_by(db_models.Fetcher.reg_date.asc())
+        .all()
+    )
+
+    return pyd_models.PartitionBalance(
+        long_term_part_mode=long_term_part_mode,
+        fetchers=[
+            pyd_models.FetcherBalance(
+                uuid=fetcher_balance.uuid,
+                fqdn_amount=fetcher_balance.fqdn_amount,
+                url_amount=fetcher_balance.url_amount,
+                reserved_fqdn_amount=fetcher_balance.reserved_fqdn_amount,
+                backlog_url_amount=fetcher_balance.backlog_url_amount,
+            )
+            for fetcher_balance in fetcher_balances
+        ],
+    )
@@ -0,0 +1,217 @@
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import db_models, pyd_models, fetchers, frontier_cache, aggregates
+from app.data import data_generator as data_gen
+from app.common import http_exceptions as http_ex, common_values as c
+
+
+def chunks(items, size=c.submit_batch_size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def get_fqdn(url):
+    return urlparse(str(url)).hostname
+
+
+def new_fqdn_row(fqdn, fetcher_amount):
+    fqdn_hash = data_gen.generate_hash(fqdn)
+    return dict(
+        fqdn=fqdn,
+        tld=fqdn.split(".")[-1],
+        fqdn_hash=fqdn_hash,
+        fqdn_hash_fetcher_index=fqdn_hash % fetcher_amount
+        if fetcher_amount != 0
+        else None,
+        fqdn_url_count=0,
+    )
+
+
+def new_url_row(url, fqdn, discovery_date, url_pagerank=None):
+    return dict(
+        url=str(url),
+        fqdn=fqdn,
+        url_pagerank=url_pagerank,
+        url_discovery_date=discovery_date,
+        url_blacklisted=False,
+        url_bot_excluded=False,
+    )
+
+
+def insert_missing_fqdns(db: Session, fqdns):
+    fetcher_amount = db.query(db_models.Fetcher).count()
+    inserted = 0
+
+    for fqdn_chunk in chunks(sorted(set(fqdns))):
+        inserted += db.execute(
+            insert(db_models.Frontier)
+            .values([new_fqdn_row(fqdn, fetcher_amount) for fqdn in fqdn_chunk])
+            .on_conflict_do_nothing(index_elements=[db_models.Frontier.fqdn])
+        ).rowcount
+
+    return inserted
+
+
+def insert_missing_urls(db: Session, url_rows):
+    """
+    Inserts all URLs which are not yet in the database, their FQDNs have to exist
+    """
+    url_rows = sorted(
+        {url_row["url"]: url_row for url_row in url_rows}.values(),
+        key=lambda url_row: url_row["url"],
+    )
+    deltas = aggregates.new_deltas()
+
+    for url_chunk in chunks(url_rows):
+        inserted_urls = db.execute(
+            insert(db_models.Url)
+            .values(url_chunk)
+            .on_conflict_do_nothing(index_elements=[db_models.Url.url])
+            .returning(db_models.Url.fqdn, db_models.Url.url_pagerank)
+        )
+
+        for fqdn, url_pagerank in inserted_urls:
+            aggregates.add_url(deltas, fqdn, url_pagerank)
+
+    aggregates.apply_deltas(db, deltas)
+
+    return sum(delta["url_count"] for delta in deltas.values())
+
+
+def insert_url_refs(db: Session, url_refs, batch_size=c.submit_batch_size):
+    ref_rows = list(
+        {
+            (str(ref.url_out), str(ref.url_in), ref.date): dict(
+                url_out=str(ref.url_out), url_in=str(ref.url_in), parsing_date=ref.date
+            )
+            for ref in url_refs
+        }.values()
+    )
+    inserted = 0
+
+    for ref_chunk in chunks(ref_rows, batch_size):
+        inserted += db.execute(
+            insert(db_models.URLRef).values(ref_chunk).on_conflict_do_nothing()
+        ).rowcount
+
+    return inserted
+
+
+def save_visited_urls(db: Session, url_rows):
+    url_rows = sorted(
+        {url_row["url"]: url_row for url_row in url_rows}.values(),
+        key=lambda url_row: url_row["url"],
+    )
+    deltas = aggregates.new_deltas()
+
+    for url_chunk in chunks(url_rows):
+        known_urls = {
+            url.url: url
+            for url in db.query(
+                db_models.Url.url, db_models.Url.fqdn, db_models.Url.url_last_visited
+            )
+            .filter(db_models.Url.url.in_([url_row["url"] for url_row in url_chunk]))
+            .with_for_update()
+        }
+
+        insert_query = insert(db_models.Url).values(url_chunk)
+        db.execute(
+            insert_query.on_conflict_do_update(
+                index_elements=[db_models.Url.url],
+                set_=dict(url_last_visited=insert_query.excluded.url_last_visited),
+            )
+        )
+
+        for url_row in url_chunk:
+            known_url = known_urls.get(url_row["url"])
+
+            if known_url is None:
+                aggregates.add_url(
+                    deltas,
+                    url_row["fqdn"],
+                    url_row["url_pagerank"],
+                    url_row["url_last_visited"],
+                )
+            else:
+                aggregates.visit_url(
+                    deltas,
+                    known_url.fqdn,
+                    known_url.url_last_visited,
+                    url_row["url_last_visited"],
+                )
+
+    aggregates.apply_deltas(db, deltas)
+
+    return len(url_rows)
+
+
+def release_reservations(db: Session, uuid, fqdns):
+    released = 0
+
+    for fqdn_chunk in chunks(sorted(set(fqdns))):
+        released += (
+            db.query(db_models.FetcherReservation)
+            .filter(db_models.FetcherReservation.fetcher_uuid == uuid)
+            .filter(db_models.FetcherReservation.fqdn.in_(fqdn_chunk))
+            .delete(synchronize_session=False)
+        )
+
+    return released
+
+
+def submit_frontier(db: Session, submission: pyd_models.SubmitFrontier):
+    if not fetchers.uuid_exists(db, submission.uuid):
+        http_ex.raise_http_404(submission.uuid)
+
+    now = datetime.now(tz=timezone.utc)
+    response = pyd_models.SubmitResponse(uuid=submission.uuid)
+
+    visited_urls = [url for fqdn in submission.fqdns for url in fqdn.url_list]
+    submitted_fqdns = [fqdn.fqdn for fqdn in submission.fqdns]
+
+    discovered_url_rows = [
+        new_url_row(url.url, url.fqdn, url.url_discovery_date or now, url.url_pagerank)
+        for url in submission.urls
+    ]
+    discovered_url_rows.extend(
+        new_url_row(url, get_fqdn(url), now)
+        for ref in submission.url_refs
+        for url in (ref.url_out, ref.url_in)
+    )
+
+    response.new_fqdn_count = insert_missing_fqdns(
+        db,
+        submitted_fqdns
+        + [url.fqdn for url in visited_urls]
+        + [url_row["fqdn"] for url_row in discovered_url_rows],
+    )
+
+    response.visited_url_count = save_visited_urls(
+        db,
+        [
+            dict(
+                new_url_row(url.url, url.fqdn, url.url_discovery_date or now),
+                url_last_visited=url.url_last_visited or now,
+            )
+            for url in visited_urls
+        ],
+    )
+
+    response.new_url_count = insert_missing_urls(db, discovered_url_rows)
+    response.new_url_ref_count = insert_url_refs(db, submission.url_refs)
+    response.released_fqdn_count = release_reservations(
+        db, submission.uuid, submitted_fqdns
+    )
+
+    db.commit()
+
+    frontier_cache.cache.release_fqdns(submission.uuid, submitted_fqdns)
+    frontier_cache.cache.refresh_fqdns(
+        set(submitted_fqdns) | {url_row["fqdn"] for url_row in discovered_url_rows}
+    )
+
+    return response
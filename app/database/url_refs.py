@@ -0,0 +1,162 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import OperationalError
+
+from app.database import database, submissions, frontier_cache
+from app.common import http_exceptions as http_ex, common_values as c
+
+
+class URLReferenceWriter:
+    """
+    Bounded in-process queue of URL reference batches. Writer threads coalesce
+    the queued batches into large inserts, independent of the client batch size.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.writers = []
+
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+
+    def put(self, url_refs):
+        if len(url_refs) > c.url_ref_queue_size:
+            http_ex.raise_http_413(len(url_refs), c.url_ref_queue_size)
+
+        with self.lock:
+            if self.queued + len(url_refs) > c.url_ref_queue_size:
+                http_ex.raise_http_503(self.queued, c.url_ref_queue_size)
+
+            self.queued += len(url_refs)
+
+        self.queue.put(url_refs)
+        self.start()
+
+        return len(url_refs)
+
+    def start(self):
+        with self.lock:
+            self.writers = [writer for writer in self.writers if writer.is_alive()]
+
+            while len(self.writers) < c.url_ref_writer_amount:
+                writer = threading.Thread(target=self.write, daemon=True)
+                writer.start()
+                self.writers.append(writer)
+
+    def next_batches(self):
+        batches = [self.queue.get()]
+        ref_amount = len(batches[0])
+
+        while ref_amount < c.url_ref_write_batch:
+            try:
+                batch = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            batches.append(batch)
+            ref_amount += len(batch)
+
+        return batches
+
+    def write(self):
+        while True:
+            batches = self.next_batches()
+            url_refs = [url_ref for batch in batches for url_ref in batch]
+
+            written, fqdns = self.write_batch(url_refs)
+
+            with self.lock:
+                self.queued -= len(url_refs)
+                self.written += written
+                self.failed += len(url_refs) - written
+
+            frontier_cache.cache.refresh_fqdns(fqdns)
+
+            for _ in batches:
+                self.queue.task_done()
+
+    def write_batch(self, url_refs):
+        """
+        Writes the URL references and returns the written amount and their FQDNs.
+        Lost connections are retried, a batch failing otherwise is split in
+        halves down to the single failing references, which are dropped.
+        """
+        for attempt in range(c.url_ref_write_attempts):
+            db = database.SessionLocal()
+            try:
+                fqdns = self.write_url_refs(db, url_refs)
+                db.commit()
+                return len(url_refs), fqdns
+
+            except OperationalError:
+                db.rollback()
+                logging.warning(
+                    "Lost connection writing {} URL references, attempt {}".format(
+                        len(url_refs), attempt + 1
+                    )
+                )
+                time.sleep(2 ** attempt)
+
+            except Exception:
+                db.rollback()
+                logging.exception(
+                    "Failed to write {} URL references".format(len(url_refs))
+                )
+                break
+
+            finally:
+                db.close()
+
+        else:
+            logging.error("Dropped {} URL references".format(len(url_refs)))
+            return 0, set()
+
+        if len(url_refs) == 1:
+            logging.error("Dropped URL reference {}".format(url_refs[0]))
+            return 0, set()
+
+        middle = len(url_refs) // 2
+        written, fqdns = self.write_batch(url_refs[:middle])
+        rest_written, rest_fqdns = self.write_batch(url_refs[middle:])
+
+        return written + rest_written, fqdns | rest_fqdns
+
+    def get_stats(self):
+        with self.lock:
+            return dict(
+                worker_pid=os.getpid(),
+                queued=self.queued,
+                capacity=c.url_ref_queue_size,
+                written=self.written,
+                failed=self.failed,
+            )
+
+    @staticmethod
+    def write_url_refs(db, url_refs):
+        now = datetime.now(tz=timezone.utc)
+        url_rows = [
+            submissions.new_url_row(url, submissions.get_fqdn(url), now)
+            for url_ref in url_refs
+            for url in (url_ref.url_out, url_ref.url_in)
+        ]
+
+        fqdns = {url_row["fqdn"] for url_row in url_rows}
+
+        submissions.insert_missing_fqdns(db, list(fqdns))
+        submissions.insert_missing_urls(db, url_rows)
+        submissions.insert_url_refs(db, url_refs, batch_size=c.url_ref_write_batch)
+
+        return fqdns
+
+    def flush(self):
+        self.queue.join()
+
+
+writer = URLReferenceWriter()
@@ -1,9 +1,13 @@
-from app.database import fetchers, db_models, pyd_models, sample_generator, frontier
+from app.database import fetchers, pyd_models, sample_generator, frontier
+from app.database import frontier_cache, reaper, submissions, url_refs, migrations
+from app.database import notifications, stats
 from app.database import database
 from app.common import http_exceptions as http_es
+from app.common import enum
 
 from fastapi import FastAPI, Depends, status, BackgroundTasks
 from fastapi.routing import Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.gzip import GZipMiddleware
 
 import os
@@ -14,7 +18,7 @@ import logging
 
 logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO"))
 
-db_models.Base.metadata.create_all(bind=database.engine)
+migrations.migrate()
 
 app = FastAPI(
     title="WebSch",
@@ -26,6 +30,31 @@ app = FastAPI(
 app.add_middleware(GZipMiddleware, minimum_size=150)
 
 
+@app.on_event("startup")
+def start_reservation_reaper():
+    reaper.reaper.start()
+
+
+@app.on_event("shutdown")
+def stop_reservation_reaper():
+    reaper.reaper.stop()
+
+
+@app.on_event("startup")
+def start_notification_listener():
+    notifications.listener.start(database.engine)
+
+
+@app.on_event("shutdown")
+def stop_notification_listener():
+    notifications.listener.stop()
+
+
+@app.on_event("shutdown")
+def flush_url_ref_writer():
+    url_refs.writer.flush()
+
+
 # Dependency
 def get_db():
     try:
@@ -35,6 +64,42 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    An AsyncSession with DATABASE_ASYNC, else a Session for the threadpool
+    """
+    if database.AsyncSessionLocal is None:
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        async with database.AsyncSessionLocal() as db:
+            yield db
+
+
+def get_read_db():
+    try:
+        db = database.read_session()
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    if database.AsyncSessionLocal is None:
+        db = database.read_session()
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        db = await database.async_read_session()
+        async with db:
+            yield db
+
+
 # Fetcher
 @app.get(
     "/fetchers/",
@@ -43,11 +108,11 @@ def get_db():
     summary="List all Fetcher",
     response_description="A List of all Fetcher in the Database",
 )
-def read_fetcher(db: Session = Depends(get_db)):
+async def read_fetcher(db=Depends(get_async_read_db)):
     """
     List all Fetcher
     """
-    all_fetcher = fetchers.get_all_fetcher(db)
+    all_fetcher = await database.run(db, fetchers.get_all_fetcher)
     return all_fetcher
 
 
@@ -60,10 +125,10 @@ def read_fetcher(db: Session = Depends(get_db)):
     summary="Create a Fetcher",
     response_description="Information about the newly created Fetcher",
 )
-def register_fetcher(
+async def register_fetcher(
     fetcher: pyd_models.CreateFetcher,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
     """
     Create a Fetcher
@@ -73,10 +138,10 @@ def register_fetcher(
     - **location** (optional): The location where the fetcher resides
     - **pref_tld** (optional): The Top-Level-Domain, which the fetcher prefers to crawl
     """
-    new_fetcher = fetchers.create_fetcher(db, fetcher)
+    new_fetcher = await database.run(db, fetchers.create_fetcher, fetcher)
 
-    if database.fqdn_hash_activated(db):
-        background_tasks.add_task(database.refresh_fqdn_hashes, db)
+    if await database.run(db, database.fqdn_hash_activated):
+        background_tasks.add_task(database.run, db, database.refresh_fqdn_hashes)
 
     return new_fetcher
 
@@ -90,7 +155,7 @@ def register_fetcher(
     summary="Reset fetcher information",
     response_description="Information about the fetcher",
 )
-def update_crawler(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_db)):
+async def update_crawler(fetcher: pyd_models.UpdateFetcher, db=Depends(get_async_db)):
     """
     Update a Fetcher - Unprovided Fields will be reset
 
@@ -99,7 +164,7 @@ def update_crawler(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_
     - **location** (optional): The location where the fetcher resides
     - **pref_tld** (optional): The Top-Level-Domain, which the fetcher prefers to crawl
     """
-    updated_fetcher = fetchers.update_fetcher(db, fetcher)
+    updated_fetcher = await database.run(db, fetchers.update_fetcher, fetcher)
     return updated_fetcher
 
 
@@ -112,7 +177,7 @@ def update_crawler(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_
     summary="Update a fetcher",
     response_description="Information about the updated created fetcher",
 )
-def patch_fetcher(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_db)):
+async def patch_fetcher(fetcher: pyd_models.UpdateFetcher, db=Depends(get_async_db)):
     """
     Update a Fetcher -  Unprovided Fields will be ignored
 
@@ -122,7 +187,7 @@ def patch_fetcher(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_d
     - **pref_tld** (optional): The Top-Level-Domain, which the fetcher prefers to crawl
     """
 
-    patched_fetcher = fetchers.patch_fetcher(db, fetcher)
+    patched_fetcher = await database.run(db, fetchers.patch_fetcher, fetcher)
     return patched_fetcher
 
 
@@ -133,20 +198,20 @@ def patch_fetcher(fetcher: pyd_models.UpdateFetcher, db: Session = Depends(get_d
     summary="Delete a Fetcher",
     response_description="No Content",
 )
-def delete_fetcher(
+async def delete_fetcher(
     fetcher: pyd_models.DeleteFetcher,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
     """
     Delete a specific Fetcher
 
     - **uuid**: UUID of the fetcher, which has to be deleted
     """
-    fetchers.delete_fetcher(db, fetcher)
+    await database.run(db, fetchers.delete_fetcher, fetcher)
 
-    if database.fqdn_hash_activated(db):
-        background_tasks.add_task(database.refresh_fqdn_hashes, db)
+    if await database.run(db, database.fqdn_hash_activated):
+        background_tasks.add_task(database.run, db, database.refresh_fqdn_hashes)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -159,7 +224,7 @@ def delete_fetcher(
     summary="Get URL-Lists",
     response_description="The received URL-Lists",
 )
-def get_frontier(request: pyd_models.FrontierRequest, db: Session = Depends(get_db)):
+async def get_frontier(request: pyd_models.FrontierRequest, db=Depends(get_async_db)):
     """
     Get a Sub List of the global Frontier
 
@@ -170,10 +235,76 @@ def get_frontier(request: pyd_models.FrontierRequest, db: Session = Depends(get_
     - **long_term_part_mode** (default: none): The modus in which the FQDN Frontier is partitioned
     - **short_term_prio_mode** (default: random): The modus in which the URL Frontier is prioritized
     """
-    fqdn_frontier = frontier.get_fqdn_frontier(db, request)
+    fqdn_frontier = await database.run(db, frontier.get_fqdn_frontier, request)
     return fqdn_frontier
 
 
+@app.post(
+    "/frontiers/stream/",
+    status_code=status.HTTP_200_OK,
+    tags=["Frontier"],
+    summary="Stream URL-Lists",
+    response_description="The received URL-Lists as Newline Delimited JSON",
+)
+def stream_frontier(request: pyd_models.FrontierRequest, db: Session = Depends(get_db)):
+    """
+    Get a Sub List of the global Frontier as NDJSON Stream.
+    The first line holds the response information without **urls_count**,
+    every following line one URL-List
+
+    - **fetcher_uuid**: Your fetchers UUID
+    - **amount** (default: 10): The amount of URL-Lists you want to receive
+    - **length** (default: 0 = No Limit): The amount of URLs in each list
+    - **long_term_prio_mode** (default: random): The modus in which the FQDN Frontier is prioritized
+    - **long_term_part_mode** (default: none): The modus in which the FQDN Frontier is partitioned
+    - **short_term_prio_mode** (default: random): The modus in which the URL Frontier is prioritized
+    """
+    frontier_stream = frontier.get_fqdn_frontier_stream(db, request)
+    return StreamingResponse(frontier_stream, media_type="application/x-ndjson")
+
+
+@app.post(
+    "/submit/",
+    status_code=status.HTTP_200_OK,
+    response_model=pyd_models.SubmitResponse,
+    tags=["Frontier"],
+    summary="Submit crawled URL-Lists",
+    response_description="Counts of the saved submission",
+)
+def submit_frontier(
+    submission: pyd_models.SubmitFrontier, db: Session = Depends(get_db)
+):
+    """
+    Submit the crawled URL-Lists and releases their FQDN reservations
+
+    - **uuid**: Your fetchers UUID
+    - **fqdns**: The crawled URL-Lists, visited URLs are saved with their visiting date
+    - **urls** (optional): Newly discovered URLs
+    - **url_refs** (optional): Links between URLs, found while parsing
+    """
+    return submissions.submit_frontier(db, submission)
+
+
+@app.post(
+    "/url_refs/",
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Frontier"],
+    summary="Submit URL References",
+    response_description="Accepted",
+)
+def submit_url_refs(request: pyd_models.URLReferenceBatch):
+    """
+    Queues links between URLs for writing, unknown URLs are created.
+    Answers with 503 when the queue is full and with 413 when the batch
+    exceeds the queue capacity
+
+    - **url_refs**: The found links, with url_out, url_in and the parsing date
+    """
+    url_refs.writer.put(request.url_refs)
+
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
 # Development Tools
 @app.delete(
     "/database/", tags=["Development Tools"], summary="Delete Example Database",
@@ -195,6 +326,7 @@ async def delete_example_db(
     """
 
     background_tasks.add_task(database.reset, db, request)
+    background_tasks.add_task(frontier_cache.cache.invalidate)
 
     return Response(status_code=status.HTTP_202_ACCEPTED)
 
@@ -217,15 +349,33 @@ async def generate_example_db(
     - **connection_amount** (default: 0): Amount of incoming Connections per Page
     - **fixed_crawl_delay** (default: None): Adjust the Crawl Delay for all Web Sites.
         Will be a distributed-randomized Value when no Value is chosen.
+    - **bulk** (default: false): Writes the Data with COPY in large chunks,
+        Connections link to a Sample of the generated Pages only
+    - **seed** (default: None): Generates the same Web Sites and Pages for the same
+        Seed, in bulk mode
+    - **processes** (default: 1): Worker Processes generating in bulk mode
     """
     if request.min_url_amount > request.max_url_amount:
         http_es.raise_http_400(request.min_url_amount, request.max_url_amount)
 
+    if request.processes < 1:
+        http_es.raise_http_400(1, request.processes)
+
     background_tasks.add_task(
         sample_generator.create_sample_fetcher, db, amount=request.fetcher_amount,
     )
 
-    background_tasks.add_task(sample_generator.create_sample_frontier, db, request)
+    if request.seed is not None or request.processes > 1:
+        background_tasks.add_task(
+            sample_generator.create_sample_frontier_parallel, db, request
+        )
+    elif request.bulk:
+        background_tasks.add_task(
+            sample_generator.create_sample_frontier_bulk, db, request
+        )
+    else:
+        background_tasks.add_task(sample_generator.create_sample_frontier, db, request)
+    background_tasks.add_task(frontier_cache.cache.invalidate)
 
     if database.fqdn_hash_activated(db):
         background_tasks.add_task(database.refresh_fqdn_hashes, db)
@@ -236,15 +386,94 @@ async def generate_example_db(
 @app.get(
     "/stats/",
     response_model=pyd_models.StatsResponse,
+    response_model_exclude_none=True,
     tags=["Development Tools"],
     summary="Get Statistics for Database",
 )
-def get_db_stats(db: Session = Depends(get_db)):
+async def get_db_stats(approximate: bool = False, db=Depends(get_async_read_db)):
+    """
+    Returns Statistics from current Database Status, cached for
+    STATS_CACHE_TTL seconds
+
+    - **approximate** (default: false): Counts from the planner estimates,
+    visited ratio and freshness from a sample of the URLs with the
+    half-widths of their 95% confidence intervals
+    """
+
+    return await database.run(db, stats.get_cached_db_stats, approximate)
+
+
+@app.get(
+    "/stats/balance/",
+    response_model=pyd_models.PartitionBalance,
+    tags=["Development Tools"],
+    summary="Get the Partition Balance of the Fetchers",
+)
+async def get_partition_balance(
+    long_term_part_mode: enum.LONGPART = None, db=Depends(get_async_read_db)
+):
+    """
+    Returns how many FQDNs and URLs every fetcher owns under a partitioning
+    mode, how many FQDNs it has reserved and how many of its URLs were not
+    visited yet. Without partitioning no fetcher owns any FQDN.
+
+    - **long_term_part_mode** (default: current setting): The partitioning mode
+    """
+    if long_term_part_mode is None:
+        long_term_part_mode = (
+            await database.run(db, database.long_term_part_mode) or enum.LONGPART.none
+        )
+
+    return await database.run(db, stats.get_partition_balance, long_term_part_mode)
+
+
+@app.get(
+    "/stats/reaper/",
+    response_model=pyd_models.ReaperStats,
+    tags=["Development Tools"],
+    summary="Get Statistics for the Reservation Reaper",
+)
+def get_reaper_stats():
+    """
+    Returns how many expired reservations the reaper released.
+    Every worker runs its own reaper, the statistics only cover the worker
+    with the returned **worker_pid** which answered this request.
+    """
+
+    return reaper.reaper.get_stats()
+
+
+@app.get(
+    "/stats/url_refs/",
+    response_model=pyd_models.URLReferenceStats,
+    tags=["Development Tools"],
+    summary="Get Statistics for the URL Reference Ingest",
+)
+def get_url_ref_stats():
+    """
+    Returns how many URL references are queued and how many were written or
+    dropped. Every worker holds its own queue, the statistics only cover the
+    worker with the returned **worker_pid** which answered this request.
+    """
+
+    return url_refs.writer.get_stats()
+
+
+@app.get(
+    "/stats/pool/",
+    response_model=pyd_models.PoolStats,
+    tags=["Development Tools"],
+    summary="Get Statistics for the Database Connection Pool",
+)
+def get_pool_stats():
     """
-    Returns Statistics from current Database Status
+    Returns the size of the connection pool and how many connections are
+    checked in, checked out or opened beyond the size. Every worker holds its
+    own pool, the statistics only cover the worker with the returned
+    **worker_pid** which answered this request.
     """
 
-    return frontier.get_db_stats(db)
+    return database.get_pool_stats()
 
 
 @app.get(
@@ -254,7 +483,7 @@ def get_db_stats(db: Session = Depends(get_db)):
     summary="Get Random Urls from Database",
 )
 def get_random_urls(
-    db: Session = Depends(get_db), amount: int = 1, fqdn: str = None
+    db: Session = Depends(get_read_db), amount: int = 1, fqdn: str = None
 ):
     """
     Returns a requested amount of random existing URLs from the Database
@@ -270,7 +499,7 @@ def get_random_urls(
     tags=["Development Tools"],
     summary="Get Settings for Fetcher",
 )
-def get_fetcher_settings(db: Session = Depends(get_db)):
+def get_fetcher_settings(db: Session = Depends(get_read_db)):
     """
     Returns the latest settings for every fetcher
     """
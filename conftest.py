@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# Tests compare statistics before and after changes
+os.environ.setdefault("STATS_CACHE_TTL", "0")
+
+from app.database import migrations
+
+
+@pytest.fixture(scope="session", autouse=True)
+def upgrade_schema():
+    migrations.upgrade()
@@ -0,0 +1,4 @@
+#! /usr/bin/env bash
+
+# Apply pending schema migrations once, before the workers start
+python -m app.database.migrations
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+from app.database import aggregates, db_models
+
+
+def test_url_list_aggregates():
+    url_list = [
+        db_models.Url(
+            url_pagerank=0.2,
+            url_last_visited=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        ),
+        db_models.Url(
+            url_pagerank=0.4,
+            url_last_visited=datetime(2020, 1, 3, tzinfo=timezone.utc),
+        ),
+        db_models.Url(url_pagerank=0.6, url_last_visited=None),
+    ]
+
+    aggregate_values = aggregates.url_list_aggregates(url_list)
+
+    assert aggregate_values["fqdn_url_count"] == 3
+    assert round(aggregate_values["fqdn_avg_pagerank"], 6) == 0.4
+    assert aggregate_values["fqdn_visited_count"] == 2
+    assert aggregate_values["fqdn_last_visited_sum"] == (
+        datetime(2020, 1, 2, tzinfo=timezone.utc).timestamp() * 2
+    )
+
+
+def test_visit_url_counts_first_visit_only():
+    deltas = aggregates.new_deltas()
+    first_visit = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    second_visit = datetime(2020, 1, 2, tzinfo=timezone.utc)
+
+    aggregates.visit_url(deltas, "www.example.com", None, first_visit)
+    aggregates.visit_url(deltas, "www.example.com", first_visit, second_visit)
+
+    assert deltas["www.example.com"]["visited_count"] == 1
+    assert deltas["www.example.com"]["last_visited_sum"] == second_visit.timestamp()
+
+
+def test_timestamp_takes_naive_datetimes_as_utc():
+    assert aggregates.timestamp(datetime(2020, 1, 1)) == aggregates.timestamp(
+        datetime(2020, 1, 1, tzinfo=timezone.utc)
+    )
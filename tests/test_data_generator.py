@@ -2,7 +2,11 @@ from app.data import data_generator as data_gen
 from app.common import random_data_generator as rand_gen
 from app.database import sample_generator as sam_gen
 from app.database import pyd_models as pyd
-from datetime import datetime
+from app.database import aggregates, database, db_models
+from app.common import common_values as c
+from tests import rest_api as rest
+
+db = database.SessionLocal()
 
 
 def test_get_random_pagerank():
@@ -47,12 +51,63 @@ def test_get_random_crawl_delay():
     assert isinstance(crawl_delay_list[0], int) or crawl_delay_list[0] is None
 
 
-def test_avg_dates():
+def test_url_list_aggregates_of_sample_urls():
     request = pyd.GenerateRequest(visited_ratio=0.5)
     fqdn = rand_gen.get_random_fqdn()
     url_list = rand_gen.random_urls(fqdn, 10)
     fqdn_url_list = [sam_gen.new_url(url_list[i], fqdn, request) for i in range(10)]
 
-    avg_date = sam_gen.avg_dates(fqdn_url_list)
-    print(avg_date)
-    assert isinstance(avg_date, datetime)
+    aggregate_values = aggregates.url_list_aggregates(fqdn_url_list)
+    print(aggregate_values)
+    assert aggregate_values["fqdn_url_count"] == 10
+    assert aggregate_values["fqdn_visited_count"] == len(
+        [url for url in fqdn_url_list if url.url_last_visited is not None]
+    )
+
+
+def test_url_pool_keeps_a_bounded_sample(monkeypatch):
+    monkeypatch.setattr(c, "generate_url_pool_size", 10)
+    url_pool = sam_gen.UrlPool()
+
+    for i in range(100):
+        url_pool.add("http://www.example.com/{}".format(i))
+
+    assert len(url_pool.urls) == 10
+    assert url_pool.added == 100
+    assert len(url_pool.sample(5)) == 5
+    assert len(url_pool.sample(50)) == 10
+
+
+def generated_rows(db):
+    return (
+        sorted((url.url, url.url_last_visited) for url in db.query(db_models.Url)),
+        sorted(
+            (ref.url_out, ref.url_in, ref.parsing_date)
+            for ref in db.query(db_models.URLRef)
+        ),
+    )
+
+
+def test_parallel_generation_is_reproducible(monkeypatch):
+    monkeypatch.setattr(c, "generate_shard_size", 5)
+    request = pyd.GenerateRequest(
+        fqdn_amount=12,
+        min_url_amount=2,
+        max_url_amount=4,
+        visited_ratio=0.5,
+        connection_amount=1,
+        seed=42,
+    )
+
+    rest.delete_full_database(full=True)
+    counts = sam_gen.create_sample_frontier_parallel(
+        db, request.copy(update={"processes": 2})
+    )
+    rows = generated_rows(db)
+
+    rest.delete_full_database(full=True)
+    sam_gen.create_sample_frontier_parallel(db, request)
+
+    assert counts["fqdn_amount"] == 12
+    assert counts["url_amount"] == len(rows[0])
+    assert generated_rows(db) == rows
@@ -1,14 +1,23 @@
+import asyncio
+
 from app.database import fetchers, frontier, database, db_models, pyd_models
 from app.common import common_values as c
+from app.common import credentials as cred
 from tests import rest_api as rest
 from tests import db_query
 from time import sleep
 
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql.elements import BooleanClauseList
 
 db = database.SessionLocal()
 
 
+def autocommit_connection():
+    return database.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
 def test_get_fetcher_hashes():
     fetcher_amount = 10
     rest.delete_full_database(full=True)
@@ -72,4 +81,92 @@ def test_bigger_hash_range_query_filter():
     print(filter_query)
 
     assert isinstance(filter_query, BooleanClauseList)
-    assert len(filter_query) == len(hash_range)
\ No newline at end of file
+    assert len(filter_query) == len(hash_range)
+
+def test_refresh_fqdn_hashes():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=3, fqdn_amount=20)
+
+    db.query(db_models.Frontier).update(
+        {db_models.Frontier.fqdn_hash_fetcher_index: -1}
+    )
+    db.commit()
+
+    database.refresh_fqdn_hashes(db)
+
+    for fqdn in db.query(db_models.Frontier).all():
+        db.refresh(fqdn)
+        assert fqdn.fqdn_hash_fetcher_index == fqdn.fqdn_hash % 3
+
+
+def test_create_missing_indexes():
+    db.execute("DROP INDEX IF EXISTS url_fqdn_pagerank_index")
+    db.commit()
+
+    with autocommit_connection() as conn:
+        created = database.create_missing_indexes(conn)
+        created_again = database.create_missing_indexes(conn)
+
+    index_names = [
+        index["name"] for index in inspect(database.engine).get_indexes("urls")
+    ]
+
+    assert created == ["url_fqdn_pagerank_index"]
+    assert "url_fqdn_pagerank_index" in index_names
+    assert created_again == []
+
+
+def test_create_missing_indexes_rebuilds_invalid_indexes():
+    db.execute(
+        "UPDATE pg_index SET indisvalid = false "
+        "WHERE indexrelid = 'url_fqdn_pagerank_index'::regclass"
+    )
+    db.commit()
+
+    with autocommit_connection() as conn:
+        created = database.create_missing_indexes(conn)
+        index_validity = database.get_index_validity(conn, "urls")
+
+    assert created == ["url_fqdn_pagerank_index"]
+    assert index_validity["url_fqdn_pagerank_index"]
+
+
+def test_run_awaits_sync_database_code():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=3)
+
+    all_fetcher = asyncio.run(database.run(db, fetchers.get_all_fetcher))
+
+    assert len(all_fetcher) == 3
+
+
+def test_get_pool_stats():
+    response = rest.client.get(c.pool_stats_endpoint)
+
+    assert response.status_code == 200
+    assert response.json()["size"] == c.database_pool_size
+    assert response.json()["checked_out"] >= 0
+
+
+def test_read_session_uses_replica(monkeypatch):
+    replica_engine = database.create_sync_engine(cred.postgres_uri)
+    monkeypatch.setattr(
+        database, "ReplicaSessionLocal", sessionmaker(bind=replica_engine)
+    )
+
+    read_db = database.read_session()
+
+    assert read_db.bind is replica_engine
+    read_db.close()
+
+
+def test_read_session_falls_back_to_primary(monkeypatch):
+    unreachable_engine = database.create_sync_engine("localhost:1")
+    monkeypatch.setattr(
+        database, "ReplicaSessionLocal", sessionmaker(bind=unreachable_engine)
+    )
+
+    read_db = database.read_session()
+
+    assert read_db.bind is database.engine
+    read_db.close()
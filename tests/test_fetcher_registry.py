@@ -0,0 +1,47 @@
+from app.database import fetcher_registry, fetchers, database, db_models
+from app.common import common_values as c
+
+from tests import values as v
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def test_registry_indexes_fetchers_by_registration():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=4)
+
+    registry = fetcher_registry.get_registry(db)
+    all_fetcher = (
+        db.query(db_models.Fetcher).order_by(db_models.Fetcher.reg_date.asc()).all()
+    )
+
+    assert [registry.index(fetcher.uuid) for fetcher in all_fetcher] == [0, 1, 2, 3]
+    assert registry.index(v.sample_uuid) == -1
+    assert registry.get(all_fetcher[0].uuid).tld_preference == (
+        all_fetcher[0].tld_preference
+    )
+
+
+def test_uuid_exists_reloads_stale_registry():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1)
+    fetcher_registry.get_registry(db)
+
+    db.add(db_models.Fetcher(uuid=v.sample_uuid))
+    db.commit()
+
+    assert fetcher_registry.get_registry(db).get(v.sample_uuid) is None
+    assert fetchers.uuid_exists(db, v.sample_uuid)
+
+
+def test_deleted_fetcher_leaves_registry():
+    rest.delete_full_database(full=True)
+    uuid = rest.client.post(
+        c.fetcher_endpoint, json={"contact": v.test_email_1, "name": "IsaacIV"}
+    ).json()["uuid"]
+    assert fetchers.uuid_exists(db, uuid)
+
+    rest.client.delete(c.fetcher_endpoint, json={"uuid": uuid})
+
+    assert not fetchers.uuid_exists(db, uuid)
@@ -110,6 +110,82 @@ def test_create_fqdn_list():
     assert len(fqdn_list) == 2
 
 
+def test_short_term_frontiers():
+    rest.delete_full_database(full=True)
+    rest.create_database(
+        fetcher_amount=1, fqdn_amount=5, min_url_amount=3, max_url_amount=3
+    )
+    uuid = rest.get_first_fetcher_uuid()
+
+    frontier_request = pyd_models.FrontierRequest(
+        fetcher_uuid=uuid,
+        amount=3,
+        length=2,
+        short_term_prio_mode=enum.SHORTPRIO.pagerank,
+    )
+
+    fqdn_list = frontier.create_fqdn_list(db, frontier_request)
+    url_lists = frontier.short_term_frontiers(db, frontier_request, fqdn_list)
+
+    assert len(url_lists) == 3
+    for fqdn in fqdn_list:
+        url_list = url_lists[fqdn.fqdn]
+        assert len(url_list) == 2
+        assert all(url.fqdn == fqdn.fqdn for url in url_list)
+        assert url_list[0].url_pagerank >= url_list[1].url_pagerank
+
+
+def test_claim_fqdn_list():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10)
+    first_uuid, second_uuid = rest.get_fetcher_uuids()
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=1)
+
+    first_request = pyd_models.FrontierRequest(fetcher_uuid=first_uuid, amount=6)
+    second_request = pyd_models.FrontierRequest(fetcher_uuid=second_uuid, amount=6)
+
+    first_fqdns = frontier.claim_fqdn_list(db, first_request, latest_return)
+    second_fqdns = frontier.claim_fqdn_list(db, second_request, latest_return)
+
+    first_fqdn_set = {fqdn.fqdn for fqdn in first_fqdns}
+    second_fqdn_set = {fqdn.fqdn for fqdn in second_fqdns}
+
+    assert len(first_fqdn_set) == 6
+    assert len(second_fqdn_set) == 4
+    assert first_fqdn_set.isdisjoint(second_fqdn_set)
+    assert (
+        db.query(db_models.FetcherReservation)
+        .filter(db_models.FetcherReservation.fetcher_uuid == first_uuid)
+        .count()
+        == 6
+    )
+
+
+def test_reserve_fqdns_skips_active_reservations():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=2)
+    first_uuid, second_uuid = rest.get_fetcher_uuids()
+    first_fqdn, second_fqdn = [fqdn.fqdn for fqdn in db.query(db_models.Frontier)]
+    now = datetime.now(tz=timezone.utc)
+
+    database.reserve_fqdns(db, first_uuid, [first_fqdn], now + timedelta(hours=1))
+    database.reserve_fqdns(db, first_uuid, [second_fqdn], now - timedelta(hours=1))
+    db.commit()
+
+    reserved = database.reserve_fqdns(
+        db, second_uuid, [first_fqdn, second_fqdn], now + timedelta(hours=1)
+    )
+    db.commit()
+
+    assert reserved == [second_fqdn]
+    assert (
+        db.query(db_models.FetcherReservation.fetcher_uuid)
+        .filter(db_models.FetcherReservation.fqdn == second_fqdn)
+        .scalar()
+        == second_uuid
+    )
+
+
 def test_save_reservations_with_old_entries():
     rest.delete_full_database(full=True)
     rest.create_database(fetcher_amount=3, fqdn_amount=10)
@@ -144,6 +220,30 @@ def test_save_reservations_with_old_entries():
     )
 
 
+def test_save_reservations_updates_latest_return():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=10)
+
+    fetcher_uuid = rest.get_first_fetcher_uuid()
+    response = rest.get_simple_frontier(fetcher_uuid)
+    frontier_response = pyd_models.FrontierResponse(
+        uuid=fetcher_uuid, url_frontiers=response["url_frontiers"]
+    )
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(days=2)
+
+    assert frontier.save_reservations(db, frontier_response, latest_return)
+
+    reservations = (
+        db.query(db_models.FetcherReservation)
+        .filter(db_models.FetcherReservation.fetcher_uuid == fetcher_uuid)
+        .all()
+    )
+    assert len(reservations) == 2
+    for reservation in reservations:
+        db.refresh(reservation)
+        assert reservation.latest_return == latest_return
+
+
 def test_get_referencing_urls():
     rest.delete_full_database(full=True)
     rest.create_database()
@@ -168,6 +268,18 @@ def test_get_random_urls():
     assert len(result["url_list"]) == 5
 
 
+def test_random_sample_wraps_around():
+    rest.delete_full_database(full=True)
+    rest.create_database(min_url_amount=10, max_url_amount=10)
+
+    url_query = db.query(db_models.Url)
+    sample = frontier.random_sample(url_query, db_models.Url.url_random_key, 10)
+    full_sample = frontier.random_sample(url_query, db_models.Url.url_random_key, 0)
+
+    assert len({url.url for url in sample}) == 10
+    assert len(full_sample) == 10
+
+
 def test_query_avg_freshness():
     avg_fresh = frontier.calculate_avg_freshness(db)
     assert isinstance(avg_fresh, str)
@@ -0,0 +1,80 @@
+from app.database import frontier_cache, database, db_models, pyd_models
+from app.common import enum
+
+from tests import rest_api as rest
+from datetime import datetime, timedelta, timezone
+
+db = database.SessionLocal()
+
+
+def test_sort_key_orders_nulls_like_postgres():
+    small = db_models.Frontier(fqdn="small", fqdn_url_count=1)
+    large = db_models.Frontier(fqdn="large", fqdn_url_count=10)
+    unknown = db_models.Frontier(fqdn="unknown", fqdn_url_count=None)
+
+    large_first = sorted(
+        [small, large, unknown],
+        key=lambda f: frontier_cache.sort_key(f, enum.LONGPRIO.large_sites_first),
+    )
+    small_first = sorted(
+        [small, large, unknown],
+        key=lambda f: frontier_cache.sort_key(f, enum.LONGPRIO.small_sites_first),
+    )
+
+    assert [f.fqdn for f in large_first] == ["unknown", "large", "small"]
+    assert [f.fqdn for f in small_first] == ["small", "large", "unknown"]
+
+
+def test_frontier_cache_claim():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10, max_url_amount=20)
+    first_uuid, second_uuid = rest.get_fetcher_uuids()
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=1)
+
+    cache = frontier_cache.FrontierCache()
+    first_request = pyd_models.FrontierRequest(
+        fetcher_uuid=first_uuid,
+        amount=4,
+        long_term_prio_mode=enum.LONGPRIO.large_sites_first,
+    )
+    second_request = pyd_models.FrontierRequest(fetcher_uuid=second_uuid, amount=0)
+
+    first_fqdns = cache.claim(first_request, latest_return)
+    second_fqdns = cache.claim(second_request, latest_return)
+
+    url_counts = [fqdn.fqdn_url_count for fqdn in first_fqdns]
+    assert url_counts == sorted(url_counts, reverse=True)
+    assert len(second_fqdns) == 6
+    assert {f.fqdn for f in first_fqdns}.isdisjoint({f.fqdn for f in second_fqdns})
+    assert db.query(db_models.FetcherReservation).count() == 10
+
+    db.query(db_models.FetcherReservation).filter(
+        db_models.FetcherReservation.fetcher_uuid == first_uuid
+    ).delete()
+    db.commit()
+    cache.release_fetcher(first_uuid)
+    assert len(cache.claim(second_request, latest_return)) == 4
+
+
+def test_frontier_caches_of_two_workers_claim_disjoint_fqdns():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10)
+    first_uuid, second_uuid = rest.get_fetcher_uuids()
+    latest_return = datetime.now(tz=timezone.utc) + timedelta(hours=1)
+
+    first_cache = frontier_cache.FrontierCache()
+    second_cache = frontier_cache.FrontierCache()
+    first_cache.load()
+    second_cache.load()
+
+    first_fqdns = first_cache.claim(
+        pyd_models.FrontierRequest(fetcher_uuid=first_uuid, amount=6), latest_return
+    )
+    second_fqdns = second_cache.claim(
+        pyd_models.FrontierRequest(fetcher_uuid=second_uuid, amount=6), latest_return
+    )
+
+    assert len(first_fqdns) == 6
+    assert len(second_fqdns) == 4
+    assert {f.fqdn for f in first_fqdns}.isdisjoint({f.fqdn for f in second_fqdns})
+    assert db.query(db_models.FetcherReservation).count() == 10
@@ -0,0 +1,115 @@
+from app.database import hash_ring, database, db_models
+from app.common import common_values as c, enum
+
+from tests import values as v
+from tests import rest_api as rest
+from tests import db_query
+
+db = database.SessionLocal()
+
+
+def test_hash_ring_ranges():
+    ring = hash_ring.HashRing([(7, "id1"), (2, "id1"), (4, "id2")])
+
+    assert ring.fetcher_ranges("id1") == [("id1", 2, 4), ("id1", 7, 2)]
+    assert ring.fetcher_ranges("id2") == [("id2", 4, 7)]
+    assert ring.fetcher_ranges("id3") == []
+
+
+def test_hash_ring_owner():
+    ring = hash_ring.HashRing([(7, "id1"), (2, "id1"), (4, "id2")])
+
+    assert ring.owner(1) == "id1"
+    assert ring.owner(4) == "id2"
+    assert ring.owner(6) == "id2"
+    assert ring.owner(9) == "id1"
+
+
+def test_cached_ring_matches_database_ranges():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=5)
+
+    uuid = db_query.get_fetcher_uuid_with_max_hash(db)
+    ring_ranges = hash_ring.get_ring(db).fetcher_ranges(uuid)
+
+    assert ring_ranges == [
+        tuple(hash_range) for hash_range in database.get_fetcher_hash_ranges(db, uuid)
+    ]
+
+
+def test_ring_delta_on_join():
+    old_ring = hash_ring.HashRing([(2, "id1"), (6, "id2")])
+    new_ring = hash_ring.HashRing([(2, "id1"), (4, "id3"), (6, "id2")])
+
+    assert hash_ring.ring_delta(old_ring, new_ring) == [(4, 6, "id1", "id3")]
+    assert hash_ring.ring_delta(new_ring, old_ring) == [(4, 6, "id3", "id1")]
+
+
+def test_ring_delta_merges_adjacent_ranges():
+    old_ring = hash_ring.HashRing([(2, "id1"), (4, "id1"), (6, "id2")])
+    new_ring = hash_ring.HashRing([(2, "id3"), (6, "id2")])
+
+    assert hash_ring.ring_delta(old_ring, new_ring) == [(2, 6, "id1", "id3")]
+
+
+def test_ring_delta_from_empty_ring():
+    old_ring = hash_ring.HashRing([])
+    new_ring = hash_ring.HashRing([(5, "id1")])
+
+    assert hash_ring.ring_delta(old_ring, new_ring) == [(5, 5, None, "id1")]
+
+
+def test_rebalance_releases_moved_reservations():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=20)
+    rest.activate_consistent_hash()
+
+    uuid = rest.get_first_fetcher_uuid()
+    rest.get_frontier(
+        json_dict={
+            "fetcher_uuid": uuid,
+            "amount": 0,
+            "long_term_part_mode": enum.LONGPART.consistent_hashing,
+        }
+    )
+    reserved_before = db.query(db_models.FetcherReservation).count()
+
+    rest.client.post(
+        c.fetcher_endpoint, json={"contact": v.test_email_1, "name": "Rebalance"}
+    )
+    reservations = db.query(db_models.FetcherReservation).all()
+    rest.reset_long_term_part_strategy()
+
+    ring = hash_ring.get_ring(db)
+    for reservation in reservations:
+        fqdn = db.query(db_models.Frontier).get(reservation.fqdn)
+        assert ring.owner(fqdn.fqdn_hash) == uuid
+
+    assert reserved_before == 20
+    assert len(reservations) < reserved_before
+
+
+def test_fetcher_ranges_reload_stale_ring():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1)
+    hash_ring.get_ring(db)
+
+    db.add(db_models.Fetcher(uuid=v.sample_uuid))
+    db.commit()
+    db.add(db_models.FetcherHash(fetcher_hash=1, fetcher_uuid=v.sample_uuid))
+    db.commit()
+
+    assert hash_ring.get_ring(db).fetcher_ranges(v.sample_uuid) == []
+    assert hash_ring.get_fetcher_ranges(db, v.sample_uuid) != []
+
+
+def test_empty_hash_ranges_filter_no_fqdns():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=5)
+
+    assert (
+        db.query(db_models.Frontier)
+        .filter(database.get_hash_range_filter_query([]))
+        .count()
+        == 0
+    )
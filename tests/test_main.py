@@ -13,6 +13,7 @@ from tests import rest_api as rest
 from sqlalchemy import or_, and_
 from sqlalchemy.sql.expression import func
 from collections import defaultdict
+import json
 
 client = TestClient(app)
 db = database.SessionLocal()
@@ -259,6 +260,36 @@ def test_get_frontiers():
     assert response2.status_code == status.HTTP_200_OK
 
 
+def test_stream_frontier():
+    rest.delete_full_database(full=True)
+    rest.create_database(
+        fetcher_amount=1, fqdn_amount=3, min_url_amount=4, max_url_amount=4
+    )
+    fetcher_uuid = rest.get_first_fetcher_uuid()
+
+    response = client.post(
+        c.frontier_stream_endpoint,
+        json={"fetcher_uuid": fetcher_uuid, "amount": 2, "length": 3},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert lines[0]["uuid"] == fetcher_uuid
+    assert lines[0]["url_frontiers_count"] == 2
+    assert "urls_count" not in lines[0]
+    assert len(lines) == 3
+    assert [len(line["url_list"]) for line in lines[1:]] == [3, 3]
+
+
+def test_stream_frontier_with_bad_uuid():
+    response = client.post(
+        c.frontier_stream_endpoint, json={"fetcher_uuid": v.sample_uuid, "amount": 1},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 def test_get_fqdn_list_with_fqdn_hash():
     rest.delete_full_database(full=True)
     rest.create_database(fetcher_amount=3, fqdn_amount=50)
@@ -312,6 +343,36 @@ def test_generate_example_db():
     assert after["url_ref_amount"] == before["url_ref_amount"] + 2
 
 
+def test_generate_example_db_bulk():
+    rest.delete_full_database(full=True)
+    response = client.post(
+        c.database_endpoint,
+        json={
+            "fetcher_amount": 1,
+            "fqdn_amount": 20,
+            "min_url_amount": 5,
+            "max_url_amount": 10,
+            "visited_ratio": 0.5,
+            "connection_amount": 2,
+            "bulk": True,
+        },
+    )
+    stats = client.get(c.stats_endpoint).json()
+    fqdn_url_counts = db.query(
+        func.sum(db_models.Frontier.fqdn_url_count),
+        func.sum(db_models.Frontier.fqdn_visited_count),
+    ).one()
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert stats["frontier_amount"] == 20
+    assert 100 <= stats["url_amount"] <= 200
+    assert stats["url_ref_amount"] == 2 * stats["url_amount"]
+    assert fqdn_url_counts[0] == stats["url_amount"]
+    assert fqdn_url_counts[1] == db.query(db_models.Url).filter(
+        db_models.Url.url_last_visited.isnot(None)
+    ).count()
+
+
 def test_generate_example_db_avg_visited_date():
     rest.delete_full_database(full=True)
     response = client.post(
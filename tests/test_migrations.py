@@ -0,0 +1,56 @@
+from app.database import migrations, database, db_models
+
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def test_upgrade_to_head_revision():
+    assert migrations.upgrade() == []
+
+    with database.engine.connect() as conn:
+        assert migrations.current_revision(conn) == migrations.head_revision
+
+
+def test_aggregates_are_backfilled():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=2, max_url_amount=5)
+    expected = {
+        fqdn.fqdn: (fqdn.fqdn_url_count, fqdn.fqdn_visited_count)
+        for fqdn in db.query(db_models.Frontier)
+    }
+    db.query(db_models.Frontier).update(
+        {
+            "fqdn_url_count": None,
+            "fqdn_pagerank_sum": None,
+            "fqdn_visited_count": None,
+        }
+    )
+    db.commit()
+
+    with database.engine.connect() as conn:
+        migrations.backfill_aggregates(conn)
+
+    db.expire_all()
+    backfilled = {
+        fqdn.fqdn: (fqdn.fqdn_url_count, fqdn.fqdn_visited_count)
+        for fqdn in db.query(db_models.Frontier)
+    }
+
+    assert backfilled == expected
+
+
+def test_random_keys_are_backfilled():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=2, max_url_amount=5)
+    db.query(db_models.Url).update({"url_random_key": None})
+    db.commit()
+
+    with database.engine.connect() as conn:
+        migrations.backfill_random_keys(conn)
+
+    assert (
+        db.query(db_models.Url).filter(db_models.Url.url_random_key.is_(None)).count()
+        == 0
+    )
+
@@ -0,0 +1,66 @@
+from app.database import stats, database, db_models, hash_ring
+from app.common import common_values as c, enum
+
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def owned_fqdn_amounts(long_term_part_mode):
+    balance = stats.get_partition_balance(db, long_term_part_mode)
+    return {str(fetcher.uuid): fetcher.fqdn_amount for fetcher in balance.fetchers}
+
+
+def test_balance_of_consistent_hashing_matches_hash_ring():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=3, fqdn_amount=50)
+
+    ring = hash_ring.load_ring(db)
+    expected_amounts = {uuid: 0 for uuid in rest.get_fetcher_uuids()}
+    for fqdn in db.query(db_models.Frontier).all():
+        expected_amounts[ring.owner(fqdn.fqdn_hash)] += 1
+
+    assert owned_fqdn_amounts(enum.LONGPART.consistent_hashing) == expected_amounts
+
+
+def test_balance_of_fqdn_hash_covers_all_fqdns():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=3, fqdn_amount=50)
+    database.refresh_fqdn_hashes(db)
+
+    amounts = owned_fqdn_amounts(enum.LONGPART.fqdn_hash)
+
+    assert sum(amounts.values()) == 50
+
+
+def test_balance_of_top_level_domain():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=3, fqdn_amount=50)
+
+    amounts = owned_fqdn_amounts(enum.LONGPART.top_level_domain)
+
+    for fetcher in db.query(db_models.Fetcher).all():
+        assert amounts[fetcher.uuid] == (
+            db.query(db_models.Frontier)
+            .filter(db_models.Frontier.tld == fetcher.tld_preference)
+            .count()
+        )
+
+
+def test_get_partition_balance_endpoint():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10)
+
+    response = rest.client.get(
+        c.balance_stats_endpoint,
+        params={"long_term_part_mode": enum.LONGPART.consistent_hashing.value},
+    )
+
+    assert response.status_code == 200
+    fetcher_balances = response.json()["fetchers"]
+    assert len(fetcher_balances) == 2
+    assert sum(fetcher["fqdn_amount"] for fetcher in fetcher_balances) == 10
+    assert all(
+        fetcher["backlog_url_amount"] <= fetcher["url_amount"]
+        for fetcher in fetcher_balances
+    )
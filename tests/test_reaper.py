@@ -0,0 +1,40 @@
+import pytest
+
+from app.database import reaper, database, db_models
+from app.common import common_values as c
+
+from tests import rest_api as rest
+from datetime import datetime, timedelta, timezone
+
+db = database.SessionLocal()
+
+
+def test_reap_expired_reservations():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=5)
+    rest.get_simple_frontier(rest.get_first_fetcher_uuid())
+
+    expired_fqdn = db.query(db_models.FetcherReservation).first()
+    expired_fqdn.latest_return = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+    db.commit()
+
+    reservation_reaper = reaper.ReservationReaper()
+    released = reservation_reaper.reap(db)
+
+    assert released == 1
+    assert db.query(db_models.FetcherReservation).count() == 1
+    assert reservation_reaper.get_stats()["total_released"] == 1
+
+
+def test_get_reaper_stats():
+    response = rest.client.get(c.reaper_stats_endpoint)
+
+    assert response.status_code == 200
+    assert response.json()["interval_seconds"] == c.reaper_interval_seconds
+
+
+def test_reap_rejects_invalid_batch_size(monkeypatch):
+    monkeypatch.setattr(c, "reaper_batch_size", 0)
+
+    with pytest.raises(ValueError):
+        reaper.ReservationReaper().reap(db)
@@ -0,0 +1,55 @@
+from time import sleep
+
+from app.database import settings_cache, notifications, database, db_models
+from app.common import enum
+
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def set_part_mode_without_notification(long_term_part_mode):
+    db.query(db_models.FetcherSettings).update(
+        {"long_term_part_mode": long_term_part_mode}
+    )
+    db.commit()
+
+
+def test_settings_cached_until_invalidated():
+    rest.activate_fqdn_hash()
+    assert database.fqdn_hash_activated(db)
+
+    set_part_mode_without_notification(enum.LONGPART.none)
+    assert database.fqdn_hash_activated(db)
+
+    settings_cache.invalidate()
+    assert not database.fqdn_hash_activated(db)
+
+
+def test_put_settings_invalidates_cache():
+    rest.activate_fqdn_hash()
+    assert database.fqdn_hash_activated(db)
+
+    rest.reset_long_term_part_strategy()
+    assert not database.fqdn_hash_activated(db)
+
+
+def test_listener_invalidates_on_notification():
+    rest.activate_fqdn_hash()
+    notifications.listener.start(database.engine)
+
+    try:
+        for _ in range(50):
+            settings_cache.get_settings(db)
+            settings_cache.notify(db)
+            db.commit()
+            sleep(0.1)
+
+            if settings_cache.settings_cache["settings"] is None:
+                break
+
+        assert settings_cache.settings_cache["settings"] is None
+
+    finally:
+        notifications.listener.stop()
+        rest.reset_long_term_part_strategy()
@@ -0,0 +1,87 @@
+from app.database import stats, frontier, database, db_models
+from app.common import common_values as c
+
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def test_db_stats_match_separate_queries():
+    rest.delete_full_database(full=True)
+    rest.create_database(
+        fetcher_amount=3, fqdn_amount=20, connection_amount=5, visited_ratio=0.5
+    )
+
+    db_stats = stats.get_db_stats(db)
+
+    assert db_stats["fetcher_amount"] == db.query(db_models.Fetcher).count()
+    assert db_stats["frontier_amount"] == db.query(db_models.Frontier).count()
+    assert db_stats["url_amount"] == db.query(db_models.Url).count()
+    assert db_stats["url_ref_amount"] == db.query(db_models.URLRef).count()
+    assert db_stats["avg_freshness"] == frontier.calculate_avg_freshness(db)
+    assert db_stats["visited_ratio"] == frontier.get_visited_ratio(db)
+    assert db_stats["fqdn_hash_range"] == frontier.get_fqdn_hash_range(db)
+
+
+def test_db_stats_of_empty_database():
+    rest.delete_full_database(full=True)
+
+    db_stats = stats.get_db_stats(db)
+
+    assert db_stats["url_amount"] == 0
+    assert db_stats["avg_freshness"] == "None"
+    assert db_stats["visited_ratio"] == 0.0
+    assert db_stats["fqdn_hash_range"] == 0.0
+
+
+def test_cached_db_stats(monkeypatch):
+    monkeypatch.setattr(c, "stats_cache_ttl", 60)
+    monkeypatch.setattr(stats, "stats_cache", {})
+    rest.delete_full_database(full=True)
+
+    cached_stats = stats.get_cached_db_stats(db)
+    rest.create_database(fetcher_amount=1)
+
+    assert stats.get_cached_db_stats(db) == cached_stats
+
+    stats.stats_cache.clear()
+    assert stats.get_cached_db_stats(db)["fetcher_amount"] == 1
+
+
+def test_approximate_db_stats_of_small_tables_are_exact():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10, visited_ratio=0.5)
+
+    approximate_stats = stats.get_approximate_db_stats(db)
+    db_stats = stats.get_db_stats(db)
+
+    for key in ["fetcher_amount", "frontier_amount", "url_amount", "url_ref_amount"]:
+        assert approximate_stats[key] == db_stats[key]
+    assert approximate_stats["visited_ratio"] == db_stats["visited_ratio"]
+    assert approximate_stats["visited_ratio_error"] >= 0
+
+
+def test_approximate_db_stats_from_estimates(monkeypatch):
+    monkeypatch.setattr(c, "stats_exact_threshold", 0)
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=2, fqdn_amount=10, visited_ratio=0.5)
+
+    with database.engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as conn:
+        conn.execute("ANALYZE")
+
+    approximate_stats = stats.get_approximate_db_stats(db)
+
+    assert approximate_stats["url_amount"] == db.query(db_models.Url).count()
+    assert approximate_stats["sample_size"] == approximate_stats["url_amount"]
+    assert approximate_stats["avg_freshness_error_seconds"] > 0
+
+
+def test_get_approximate_db_stats_endpoint():
+    exact_stats = rest.client.get(c.stats_endpoint).json()
+    response = rest.client.get(c.stats_endpoint, params={"approximate": True})
+
+    assert "approximate" not in exact_stats
+    assert response.status_code == 200
+    assert response.json()["approximate"] is True
@@ -0,0 +1,132 @@
+import pytest
+
+from fastapi import status
+
+from app.database import submissions, database, db_models
+from app.common import common_values as c
+
+from tests import values as v
+from tests import rest_api as rest
+
+db = database.SessionLocal()
+
+
+def test_get_fqdn():
+    assert (
+        submissions.get_fqdn("http://www.example.com/index.html") == "www.example.com"
+    )
+
+
+def test_chunks():
+    assert list(submissions.chunks([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_submit_frontier():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=2, max_url_amount=3)
+    fetcher_uuid = rest.get_first_fetcher_uuid()
+    frontier_response = rest.get_simple_frontier(fetcher_uuid)
+    stats_before = rest.get_stats()
+
+    visited_frontier = frontier_response["url_frontiers"][0]
+    visited_url = visited_frontier["url_list"][0]["url"]
+
+    response = rest.client.post(
+        c.submit_endpoint,
+        json={
+            "uuid": fetcher_uuid,
+            "fqdn_count": 1,
+            "fqdns": [visited_frontier],
+            "url_count": 1,
+            "urls": [
+                {"url": "http://www.example.com/new.html", "fqdn": "www.example.com"}
+            ],
+            "url_refs": [
+                {
+                    "url_out": visited_url,
+                    "url_in": "http://www.example.org/linked.html",
+                    "date": "2020-07-01T12:00:00+00:00",
+                }
+            ],
+        },
+    )
+    stats_after = rest.get_stats()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["visited_url_count"] == len(visited_frontier["url_list"])
+    assert response.json()["new_fqdn_count"] == 2
+    assert response.json()["new_url_count"] == 2
+    assert response.json()["new_url_ref_count"] == 1
+    assert response.json()["released_fqdn_count"] == 1
+    assert stats_after["url_amount"] == stats_before["url_amount"] + 2
+    assert (
+        stats_after["reserved_fqdn_amount"] == stats_before["reserved_fqdn_amount"] - 1
+    )
+    assert db.query(db_models.Url).get(visited_url).url_last_visited is not None
+
+
+def test_submit_frontier_updates_aggregates():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1, fqdn_amount=1, max_url_amount=3)
+    fetcher_uuid = rest.get_first_fetcher_uuid()
+    fqdn = db.query(db_models.Frontier).first()
+    fqdn_url_count = fqdn.fqdn_url_count
+
+    response = rest.client.post(
+        c.submit_endpoint,
+        json={
+            "uuid": fetcher_uuid,
+            "fqdn_count": 0,
+            "fqdns": [],
+            "url_count": 1,
+            "urls": [
+                {
+                    "url": "http://{}/aggregate.html".format(fqdn.fqdn),
+                    "fqdn": fqdn.fqdn,
+                    "url_pagerank": 0.5,
+                }
+            ],
+        },
+    )
+    db.expire_all()
+    url_list = db.query(db_models.Url).filter(db_models.Url.fqdn == fqdn.fqdn).all()
+    updated_fqdn = db.query(db_models.Frontier).get(fqdn.fqdn)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert updated_fqdn.fqdn_url_count == fqdn_url_count + 1 == len(url_list)
+    assert updated_fqdn.fqdn_avg_pagerank == pytest.approx(
+        sum(url.url_pagerank for url in url_list) / len(url_list)
+    )
+
+
+def test_submit_frontier_with_url_ref_without_host():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=1)
+
+    response = rest.client.post(
+        c.submit_endpoint,
+        json={
+            "uuid": rest.get_first_fetcher_uuid(),
+            "fqdn_count": 0,
+            "fqdns": [],
+            "url_count": 0,
+            "url_refs": [
+                {
+                    "url_out": "/relative.html",
+                    "url_in": "http://www.example.org/linked.html",
+                    "date": "2020-07-01T12:00:00+00:00",
+                }
+            ],
+        },
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_submit_frontier_with_bad_uuid():
+    response = rest.client.post(
+        c.submit_endpoint,
+        json={"uuid": v.sample_uuid, "fqdn_count": 0, "fqdns": [], "url_count": 0},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
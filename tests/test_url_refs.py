@@ -0,0 +1,97 @@
+import pytest
+from fastapi import HTTPException, status
+
+from app.database import url_refs
+from app.common import common_values as c
+
+from tests import rest_api as rest
+
+
+def test_submit_url_refs():
+    rest.delete_full_database(full=True)
+    rest.create_database(fetcher_amount=0, fqdn_amount=1)
+    url = rest.get_random_urls()["url_list"][0]["url"]
+    stats_before = rest.get_stats()
+
+    response = rest.client.post(
+        c.url_refs_endpoint,
+        json={
+            "url_refs": [
+                {
+                    "url_out": url,
+                    "url_in": "http://www.example.org/{}.html".format(i),
+                    "date": "2020-07-01T12:00:00+00:00",
+                }
+                for i in range(3)
+            ]
+        },
+    )
+    url_refs.writer.flush()
+    stats_after = rest.get_stats()
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert stats_after["url_ref_amount"] == stats_before["url_ref_amount"] + 3
+    assert stats_after["url_amount"] == stats_before["url_amount"] + 3
+    assert stats_after["frontier_amount"] == stats_before["frontier_amount"] + 1
+
+
+def test_full_url_ref_queue():
+    writer = url_refs.URLReferenceWriter()
+    writer.queued = c.url_ref_queue_size
+
+    with pytest.raises(HTTPException) as exception:
+        writer.put([None])
+
+    assert exception.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def test_oversized_url_ref_batch(monkeypatch):
+    monkeypatch.setattr(c, "url_ref_queue_size", 2)
+    writer = url_refs.URLReferenceWriter()
+
+    with pytest.raises(HTTPException) as exception:
+        writer.put([None, None, None])
+
+    assert exception.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_write_batch_splits_failing_batches(monkeypatch):
+    def write_url_refs(db, url_refs):
+        if "bad" in url_refs:
+            raise ValueError("bad URL reference")
+
+        return set(url_refs)
+
+    monkeypatch.setattr(
+        url_refs.URLReferenceWriter, "write_url_refs", staticmethod(write_url_refs)
+    )
+    writer = url_refs.URLReferenceWriter()
+
+    written, fqdns = writer.write_batch(["a", "b", "bad", "c", "d"])
+
+    assert written == 4
+    assert fqdns == {"a", "b", "c", "d"}
+
+
+def test_submit_url_refs_without_host():
+    response = rest.client.post(
+        c.url_refs_endpoint,
+        json={
+            "url_refs": [
+                {
+                    "url_out": "/relative.html",
+                    "url_in": "http://www.example.org/linked.html",
+                    "date": "2020-07-01T12:00:00+00:00",
+                }
+            ]
+        },
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_url_ref_stats():
+    response = rest.client.get(c.url_ref_stats_endpoint)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["capacity"] == c.url_ref_queue_size